@@ -0,0 +1,117 @@
+"""Helpers shared by the manual and FastMCP dataretrieval wrappers."""
+from __future__ import annotations
+
+import base64
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def build_session(pool_connections: int, pool_maxsize: int) -> requests.Session:
+    """Create a pooled, retrying HTTP session for NWIS requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # hand the final response back so dataretrieval reports the HTTP error
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Connections kept per host by the shared NWIS session
+POOL_SIZE = 32
+
+# One keep-alive session for the whole process, shared by both wrappers
+SESSION = build_session(POOL_SIZE, POOL_SIZE)
+
+
+def install_session() -> None:
+    """Route every dataretrieval request through the shared session."""
+    import dataretrieval.utils
+
+    # dataretrieval issues every request through ``utils.requests.get``, so
+    # swapping the module for one keep-alive session lets all nwis calls reuse
+    # pooled TCP/TLS connections
+    dataretrieval.utils.requests = SESSION
+
+
+def prune_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop columns that are entirely missing or entirely the '-' placeholder."""
+    keep = []
+    for i, (has_value, dtype) in enumerate(zip(df.notna().any(axis=0).to_numpy(), df.dtypes)):
+        if not has_value:
+            continue
+        if dtype == object:
+            values = df.iloc[:, i].to_numpy()
+            # most columns are kept on their first cell, skipping the full scan
+            if values[0] == '-' and (values == '-').all():
+                continue
+        keep.append(i)
+    # one projection for both filters; under copy-on-write it copies nothing up front
+    return df if len(keep) == df.shape[1] else df.iloc[:, keep]
+
+
+def json_default(obj: Any) -> Any:
+    """Serialize values orjson does not handle natively (pandas timestamps, NaT)."""
+    # only reached while serializing pandas values, so pandas is already imported
+    import pandas as pd
+
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    return str(obj)
+
+
+def to_arrow_ipc(df: pd.DataFrame) -> str:
+    """Serialize a DataFrame as base64 text of an Arrow IPC stream."""
+    # Optional dependency, install with the "arrow" extra
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii")
+
+
+def arrow_payload(df: pd.DataFrame) -> Dict[str, Any]:
+    """Build the data/column_names/metadata fields of an Arrow IPC response."""
+    return {
+        "data": to_arrow_ipc(df),
+        "column_names": df.columns.tolist(),
+        "metadata": {"format": "arrow", "encoding": "base64"}
+    }
+
+
+def column_lists(df: pd.DataFrame) -> List[List[Any]]:
+    """Convert each column to a list, numeric ones straight from their NumPy array."""
+    lists = []
+    for i, dtype in enumerate(df.dtypes):
+        column = df.iloc[:, i]
+        lists.append(column.to_numpy().tolist() if dtype.kind in "biuf" else column.tolist())
+    return lists
+
+
+def rows(df: pd.DataFrame) -> List[Sequence[Any]]:
+    """Convert a DataFrame to row-major sequences, keeping each column's native type."""
+    dtypes = set(df.dtypes)
+    if len(dtypes) == 1 and next(iter(dtypes)).kind in "biuf":
+        # a single numeric dtype converts in one C-level pass
+        return df.to_numpy().tolist()
+    # mixed frames convert per column instead of upcasting the whole frame to an
+    # object array via .values (which would also turn ints into floats); the zipped
+    # tuples are kept as they are, since they serialize to the same JSON arrays
+    return list(zip(*column_lists(df)))
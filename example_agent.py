@@ -1,141 +1,550 @@
-import json
+import asyncio
+import hashlib
 import os
-from typing import Dict, List, Any
-from anthropic import Anthropic
+import re
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Any, AsyncIterator, Optional, Tuple
+import diskcache
+import httpx
+import numpy as np
+import orjson
+from anthropic import APIError, AsyncAnthropic, DefaultAsyncHttpxClient
+from _mcp_common import json_default
 from manual_mcp_dataretrieval import MCPDataRetrieval
 
+# Clients shared by all agents created on the same event loop, so they use one
+# HTTP/2 connection pool (and TLS sessions); pooled async connections are bound to
+# the loop that opened them, so each loop gets its own client
+_SHARED_CLIENTS = weakref.WeakKeyDictionary()
+
+
+def _new_client() -> AsyncAnthropic:
+    """Create an Anthropic client with a pooled HTTP/2 transport."""
+    return AsyncAnthropic(
+        api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        http_client=DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        ),
+    )
+
+
+def _shared_client() -> AsyncAnthropic:
+    """Return the client shared on the running event loop, creating it on first use."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # outside an event loop there is nothing to share the pool with safely
+        return _new_client()
+    client = _SHARED_CLIENTS.get(loop)
+    if client is None:
+        client = _SHARED_CLIENTS[loop] = _new_client()
+    return client
+
+_FUNCALL_RE = re.compile(r'<function_call>(.*?)</function_call>', re.DOTALL)
+
+# Number of recent conversation turns kept verbatim after a trim; the history is
+# trimmed (and the older turns summarized) once it grows to twice this, so the
+# summarizer runs about once every MAX_TURNS turns rather than on every turn
+MAX_TURNS = 10
+
+# Upper bound on rounds of tool calls answering one query; the last round's
+# follow-up may not call tools again, so it has to answer in text
+MAX_TOOL_ROUNDS = 4
+
+# How long cached LLM responses persist on disk, in seconds
+CACHE_TTL = 7 * 24 * 60 * 60
+
+# Static prompt text, composed with the dynamic parts in the _create_* methods
+_PROMPT_PREFIX = (
+    "You are an AI assistant that helps users access and analyze USGS water data.\n\n"
+    "MCP CONTEXT:\n"
+)
+_PROMPT_INSTRUCTIONS = (
+    "\n\nINSTRUCTIONS:\n"
+    "1. If you need to access water data, use the functions defined in the MCP context.\n"
+    "2. Format function calls as JSON objects of the form {\"name\": ..., \"parameters\": {...}} "
+    "inside <function_call></function_call> tags.\n"
+    "3. Explain to the user what you're doing and provide insights about the data.\n"
+)
+_TOOL_INSTRUCTIONS = (
+    "\n\nINSTRUCTIONS:\n"
+    "1. If you need to access water data, use the provided tools.\n"
+    "2. Explain to the user what you're doing and provide insights about the data.\n"
+)
+_RESULTS_INSTRUCTIONS = (
+    "INSTRUCTIONS FOR FUNCTION CALL RESULTS:\n"
+    "1. Based on the function call results, provide a helpful response to the user's query.\n"
+    "2. Explain the data and provide insights where possible.\n"
+    "3. If the data shows any interesting patterns or anomalies, point them out.\n"
+    "4. If there were any errors in the function calls, explain them to the user.\n"
+)
+# The results prompt is assembled as UTF-8 bytes around the orjson output and decoded once
+_RESULTS_PREFIX = b"FUNCTION CALL RESULTS:\n"
+_QUERY_PREFIX = b"\n\nUSER QUERY:\n"
+_RESPONSE_SUFFIX = b"\n\nYour response:\n"
+_SUMMARY_INSTRUCTIONS = (
+    "Summarize this conversation between a user and a USGS water data assistant. "
+    "Keep the sites, parameters, dates and findings that later questions may refer to."
+)
+
+
+def _dumps_bytes(obj: Any) -> bytes:
+    """Serialize an object to compact UTF-8 JSON, with the wrappers' rules for timestamps and NaT."""
+    return orjson.dumps(obj, default=json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize an object to a compact JSON string."""
+    return _dumps_bytes(obj).decode()
+
+
+_TYPE_ABBREVIATIONS = {"string": "str", "integer": "int", "number": "num", "boolean": "bool"}
+
+
+def _compact_format(mcp_context: Dict[str, Any]) -> str:
+    """
+    Render an MCP context as a compact text listing, which costs far fewer
+    tokens than the equivalent JSON schema.
+
+    Each function is written as name(param:type, ...) with required
+    parameters marked by *, followed by its description and one indented
+    line per parameter description. Metadata becomes key=value pairs and any
+    other context entries are kept as compact JSON.
+    """
+    lines = []
+    functions = mcp_context.get("functions")
+    if functions:
+        lines.append("FUNCTIONS (* = required parameter):")
+        for function in functions:
+            schema = function.get("parameters", {})
+            properties = schema.get("properties", {})
+            required = set(schema.get("required", []))
+
+            signature = []
+            for name, spec in properties.items():
+                param_type = _TYPE_ABBREVIATIONS.get(spec.get("type"), spec.get("type"))
+                param = f"{name}{'*' if name in required else ''}:{param_type}"
+                if "default" in spec:
+                    param += f"={spec['default']}"
+                signature.append(param)
+            lines.append(f"{function['name']}({', '.join(signature)}) - {function['description']}")
+
+            for name, spec in properties.items():
+                if spec.get("description"):
+                    lines.append(f"  {name}: {spec['description']}")
+
+    metadata = mcp_context.get("metadata")
+    if metadata:
+        lines.append("METADATA: " + "; ".join(f"{key}={value}" for key, value in metadata.items()))
+
+    for key, value in mcp_context.items():
+        if key not in ("functions", "metadata"):
+            lines.append(f"{key.upper()}: {_dumps(value)}")
+
+    return "\n".join(lines)
+
+
+def _block_to_dict(block: Any) -> Dict[str, Any]:
+    """Convert an Anthropic response content block to a request-ready dict."""
+    if block.type == "tool_use":
+        return {"type": "tool_use", "id": block.id, "name": block.name, "input": block.input}
+    return {"type": "text", "text": block.text}
+
+
+def _text(content: List[Dict[str, Any]]) -> str:
+    """Join the text blocks of a response's content."""
+    return "".join(block["text"] for block in content if block["type"] == "text")
+
+
 class MCPAgent:
     """An agent that uses MCP to interact with the dataretrieval library."""
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, client: AsyncAnthropic = None,
+                 model: str = "claude-3-5-haiku-latest",
+                 complex_model: str = "claude-3-5-sonnet-latest", cache: bool = True,
+                 cache_size: int = 128, cache_dir: str = "~/.mcp_agent_cache",
+                 semantic_cache: bool = False,
+                 similarity_threshold: float = 0.92, native_tools: bool = True):
         # Initialize the MCP wrapper
         self.mcp_wrapper = MCPDataRetrieval()
 
-        # Initialize the LLM client
-        self.client = Anthropic(api_key=api_key or os.environ.get("ANTHROPIC_API_KEY"))
-
-        # Initialize conversation history
+        # Initialize the LLM client, reusing the shared connection pool unless a client is given
+        if client is None:
+            client = _shared_client()
+            if api_key:
+                client = client.with_options(api_key=api_key)
+        self.client = client
+        self.model = model
+        self.complex_model = complex_model
+
+        # Initialize the response cache (in-memory LRU backed by an on-disk store
+        # that persists across runs)
+        self.cache = cache
+        self.cache_size = cache_size
+        self._memory_cache = OrderedDict()
+        self._disk_cache = diskcache.Cache(os.path.expanduser(cache_dir)) if cache else None
+
+        # Initialize the semantic cache (embeddings of past queries and their responses)
+        self.semantic_cache = semantic_cache
+        self.similarity_threshold = similarity_threshold
+        self._embedder = None
+        if semantic_cache:
+            # Optional dependency, install with the "semantic" extra
+            from sentence_transformers import SentenceTransformer
+            self._embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+            dim = self._embedder.get_sentence_embedding_dimension()
+            self._emb_matrix = np.empty((0, dim), dtype=np.float32)
+            self._emb_count = 0
+            self._cached_responses = []
+
+        # Build the tool definitions, serialized MCP context and system prompt once.
+        # With native_tools the MCP functions are passed through the tools API,
+        # otherwise they are described in the prompt and called via <function_call> tags.
+        self.native_tools = native_tools
+        self.invalidate_context()
+
+        # Initialize conversation history and the rolling summary of trimmed turns
         self.messages = []
-
-    def process_query(self, query: str) -> str:
+        self._summary = None
+
+    def invalidate_context(self):
+        """Rebuild the serialized MCP context, e.g. after the available tools change."""
+        mcp_context = self.mcp_wrapper.format_mcp_context()
+        if self.native_tools:
+            # The functions are passed as tools, so only the metadata goes in the prompt
+            self._tools = [
+                {"name": f["name"], "description": f["description"], "input_schema": f["parameters"]}
+                for f in mcp_context.pop("functions")
+            ]
+            # Tools come first in the cached prefix, so mark the end of the tool list too
+            self._tools[-1]["cache_control"] = {"type": "ephemeral"}
+        else:
+            self._tools = None
+        self._mcp_context_str = _compact_format(mcp_context)
+
+        # The system prompt is marked for Anthropic prompt caching so the large
+        # MCP context prefix is only processed in full on a cache miss
+        self._system_block = [{
+            "type": "text",
+            "text": self._create_system_prompt(),
+            "cache_control": {"type": "ephemeral"},
+        }]
+        self._results_system_block = self._system_block + [{
+            "type": "text",
+            "text": self._create_results_instructions(),
+            "cache_control": {"type": "ephemeral"},
+        }]
+
+    async def process_query(self, query: str) -> str:
         """Process a user query and interact with the dataretrieval library."""
+        return "".join([text async for text in self.process_query_stream(query)])
+
+    async def process_query_stream(self, query: str) -> AsyncIterator[str]:
+        """Process a user query, yielding the final response text as it is generated."""
 
         # Add user message to history
         self.messages.append({"role": "user", "content": query})
 
-        # Create MCP context
-        mcp_context = self.mcp_wrapper.format_mcp_context(messages=self.messages)
-
-        # Create the prompt for the LLM with the MCP context
-        prompt = self._create_prompt(query, mcp_context)
-
-        # Call the LLM
-        response = self.client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=1024,
-            messages=[{"role": "user", "content": prompt}],
+        # Return the response to a sufficiently similar past query if there is one
+        query_embedding = None
+        if self.semantic_cache:
+            query_embedding = await asyncio.to_thread(
+                self._embedder.encode, query, normalize_embeddings=True
+            )
+            cached_response = self._semantic_lookup(query_embedding)
+            if cached_response is not None:
+                self.messages.append({"role": "assistant", "content": cached_response})
+                await self._trim_history()
+                yield cached_response
+                return
+
+        model = self._pick_model(query)
+        if self.native_tools:
+            turn = self._run_tool_turn(model)
+        else:
+            turn = self._run_prompt_turn(model, query)
+
+        chunks = []
+        async for text in turn:
+            chunks.append(text)
+            yield text
+        response = "".join(chunks)
+
+        # Update conversation history; the API rejects empty assistant turns, so a
+        # query that got no text back is dropped rather than left unanswered
+        if response:
+            self.messages.append({"role": "assistant", "content": response})
+            self._semantic_store(query_embedding, response)
+        else:
+            self.messages.pop()
+        await self._trim_history()
+
+    async def _run_tool_turn(self, model: str) -> AsyncIterator[str]:
+        """Answer the latest user message using Anthropic's native tool use."""
+        # Call the LLM with the cached tools, MCP context and the conversation history
+        content = await self._cached_completion(
+            model, self._with_summary(self._system_block), self.messages, tools=self._tools
         )
 
+        tool_calls = [block for block in content if block["type"] == "tool_use"]
+        if not tool_calls:
+            yield _text(content)
+            return
+
+        messages_with_results = self.messages
+        for tool_round in range(MAX_TOOL_ROUNDS):
+            results = await self._execute_calls([(call["name"], call["input"]) for call in tool_calls])
+
+            # Answer each tool_use block with its tool_result
+            messages_with_results = messages_with_results + [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": call["id"],
+                        "content": _dumps(result),
+                        "is_error": result.get("status") == "error",
+                    }
+                    for call, result in zip(tool_calls, results)
+                ]},
+            ]
+
+            # Call the LLM again with the results, streaming its response; it may
+            # ask for more tool calls, except in the last round
+            tool_choice = {"type": "none"} if tool_round == MAX_TOOL_ROUNDS - 1 else None
+            content = []
+            async for text in self._cached_stream(
+                model, self._with_summary(self._results_system_block), messages_with_results,
+                tools=self._tools, tool_choice=tool_choice, blocks=content
+            ):
+                yield text
+
+            tool_calls = [block for block in content if block["type"] == "tool_use"]
+            if not tool_calls:
+                return
+
+    async def _run_prompt_turn(self, model: str, query: str) -> AsyncIterator[str]:
+        """Answer the latest user message using function calls embedded in the response text."""
+        # Call the LLM with the cached MCP context and the conversation history
+        assistant_message = _text(await self._cached_completion(
+            model, self._with_summary(self._system_block), self.messages
+        ))
+
         # Extract function calls if any
-        assistant_message = response.content[0].text
         function_calls = self._extract_function_calls(assistant_message)
-
-        # Process function calls and get results
-        if function_calls:
-            results = []
-            for call in function_calls:
-                function_name = call.get("name")
-                params = call.get("parameters", {})
-
-                # Execute the function
-                result = self.mcp_wrapper.call_function(function_name, params)
-                results.append({"function": function_name, "result": result})
-
-            # Create a new prompt with function results
-            prompt_with_results = self._create_prompt_with_results(query, mcp_context, results)
-
-            # Call the LLM again with the results
-            final_response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=1024,
-                messages=[{"role": "user", "content": prompt_with_results}],
-            )
-
-            # Update conversation history
-            self.messages.append({"role": "assistant", "content": final_response.content[0].text})
-
-            return final_response.content[0].text
-        else:
+        if not function_calls:
             # No function calls needed, return the original response
-            self.messages.append({"role": "assistant", "content": assistant_message})
-            return assistant_message
-
-    def _create_prompt(self, query: str, mcp_context: Dict[str, Any]) -> str:
-        """Create a prompt for the LLM with MCP context."""
-        return f"""
-        You are an AI assistant that helps users access and analyze USGS water data.
-
-        MCP CONTEXT:
-        {json.dumps(mcp_context, indent=2)}
-
-        INSTRUCTIONS:
-        1. If you need to access water data, use the functions defined in the MCP context.
-        2. Format function calls as JSON objects inside <function_call></function_call> tags.
-        3. Explain to the user what you're doing and provide insights about the data.
+            yield assistant_message
+            return
 
-        USER QUERY:
-        {query}
-
-        Your response:
+        function_results = await self._execute_calls(
+            [(call.get("name"), call.get("parameters", {})) for call in function_calls]
+        )
+        results = [
+            {"function": call.get("name"), "result": result}
+            for call, result in zip(function_calls, function_results)
+        ]
+
+        # Follow up with the function results as a new user turn
+        messages_with_results = self.messages + [
+            {"role": "assistant", "content": assistant_message},
+            {"role": "user", "content": self._create_results_prompt(query, results)},
+        ]
+
+        # Call the LLM again with the results, streaming the final response
+        async for text in self._cached_stream(
+            model, self._with_summary(self._results_system_block), messages_with_results
+        ):
+            yield text
+
+    async def _execute_calls(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute MCP function calls concurrently, as they are independent network-bound requests."""
+        return await self.mcp_wrapper.acall_functions(calls)
+
+    def _with_summary(self, system: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Append the summary of trimmed conversation turns, if any, to the system blocks."""
+        if not self._summary:
+            return system
+        # Placed after the cached blocks so it does not invalidate the cached prefix
+        return system + [{"type": "text", "text": f"EARLIER CONVERSATION SUMMARY:\n{self._summary}"}]
+
+    async def _trim_history(self):
+        """Once past 2 * MAX_TURNS turns, keep the last MAX_TURNS verbatim and fold older turns into the rolling summary."""
+        if len(self.messages) <= 4 * MAX_TURNS:
+            return
+
+        dropped = self.messages[:-2 * MAX_TURNS]
+        transcript = "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in dropped)
+        if self._summary:
+            transcript = f"EARLIER SUMMARY:\n{self._summary}\n\n{transcript}"
+
+        system = [{"type": "text", "text": _SUMMARY_INSTRUCTIONS}]
+        try:
+            summary = _text(await self._cached_completion(
+                self.model, system, [{"role": "user", "content": transcript}]
+            ))
+        except APIError:
+            # The query is already answered; keep the full history and retry the
+            # summary after the next turn rather than lose turns or the answer
+            return
+
+        # Only drop the turns once they are folded into the summary
+        self._summary = summary
+        del self.messages[:len(dropped)]
+
+    def _semantic_lookup(self, query_embedding: np.ndarray) -> Optional[str]:
+        """Return the cached response for the most similar past query, if above the threshold."""
+        if self._emb_count == 0:
+            return None
+
+        # Embeddings are normalized, so the dot product is the cosine similarity
+        sims = self._emb_matrix[:self._emb_count] @ query_embedding
+        best = int(sims.argmax())
+        if sims[best] > self.similarity_threshold:
+            return self._cached_responses[best]
+        return None
+
+    def _semantic_store(self, query_embedding: Optional[np.ndarray], response: str):
+        """Add a query embedding and its response to the semantic cache."""
+        if query_embedding is None:
+            return
+
+        # Grow the embedding matrix in chunks of rows to amortize reallocation
+        if self._emb_count == len(self._emb_matrix):
+            growth = np.empty((1024, self._emb_matrix.shape[1]), dtype=np.float32)
+            self._emb_matrix = np.vstack([self._emb_matrix, growth])
+
+        self._emb_matrix[self._emb_count] = query_embedding
+        self._emb_count += 1
+        self._cached_responses.append(response)
+
+    def _pick_model(self, query: str) -> str:
+        """Pick the smallest model likely to be sufficient for a query."""
+        # Long queries tend to be multi-part analytical requests that benefit from a larger model
+        if len(query) > 200:
+            return self.complex_model
+        return self.model
+
+    def _cache_key(self, model: str, system: List[Dict[str, Any]], messages: List[Dict[str, Any]],
+                   tools: Optional[List[Dict[str, Any]]],
+                   tool_choice: Optional[Dict[str, Any]] = None) -> str:
+        """Hash an LLM request into a response-cache key."""
+        request = orjson.dumps({"tools": tools, "tool_choice": tool_choice, "system": system, "messages": messages})
+        return hashlib.blake2b(model.encode() + request).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Look up cached response content, checking the in-memory cache before the on-disk cache."""
+        if not self.cache:
+            return None
+        content = self._memory_cache.get(key)
+        if content is None:
+            content = self._disk_cache.get(key)
+            if content is None:
+                return None
+        self._remember(key, content)
+        return content
+
+    def _cache_put(self, key: str, content: List[Dict[str, Any]]):
+        """Store response content in both cache layers."""
+        if not self.cache:
+            return
+        self._disk_cache.set(key, content, expire=CACHE_TTL)
+        self._remember(key, content)
+
+    def _remember(self, key: str, content: List[Dict[str, Any]]):
+        """Mark an in-memory cache entry as most recently used, evicting the oldest if over capacity."""
+        self._memory_cache[key] = content
+        self._memory_cache.move_to_end(key)
+        if len(self._memory_cache) > self.cache_size:
+            self._memory_cache.popitem(last=False)
+
+    async def _cached_completion(self, model: str, system: List[Dict[str, Any]],
+                                 messages: List[Dict[str, Any]],
+                                 tools: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Return the LLM response content for a request, consulting the response cache first."""
+        key = self._cache_key(model, system, messages, tools)
+        content = self._cache_get(key)
+        if content is None:
+            response = await self.client.messages.create(**self._request(model, system, messages, tools))
+            content = [_block_to_dict(block) for block in response.content]
+            self._cache_put(key, content)
+        return content
+
+    async def _cached_stream(self, model: str, system: List[Dict[str, Any]],
+                             messages: List[Dict[str, Any]],
+                             tools: Optional[List[Dict[str, Any]]] = None,
+                             tool_choice: Optional[Dict[str, Any]] = None,
+                             blocks: Optional[List[Dict[str, Any]]] = None) -> AsyncIterator[str]:
         """
+        Yield the LLM response text for a request as it is generated, or at once on a cache hit.
 
-    def _create_prompt_with_results(self, query: str, mcp_context: Dict[str, Any],
-                                  results: List[Dict[str, Any]]) -> str:
-        """Create a prompt that includes function call results."""
-        return f"""
-        You are an AI assistant that helps users access and analyze USGS water data.
-
-        MCP CONTEXT:
-        {json.dumps(mcp_context, indent=2)}
-
-        FUNCTION CALL RESULTS:
-        {json.dumps(results, indent=2)}
-
-        INSTRUCTIONS:
-        1. Based on the function call results, provide a helpful response to the user's query.
-        2. Explain the data and provide insights where possible.
-        3. If the data shows any interesting patterns or anomalies, point them out.
-        4. If there were any errors in the function calls, explain them to the user.
-
-        USER QUERY:
-        {query}
-
-        Your response:
+        The complete response content (including any tool_use blocks) is appended
+        to `blocks` when given.
         """
+        key = self._cache_key(model, system, messages, tools, tool_choice)
+        content = self._cache_get(key)
+        if content is None:
+            request = self._request(model, system, messages, tools, tool_choice)
+            async with self.client.messages.stream(**request) as response_stream:
+                async for text in response_stream.text_stream:
+                    yield text
+                response = await response_stream.get_final_message()
+            content = [_block_to_dict(block) for block in response.content]
+            self._cache_put(key, content)
+        else:
+            yield _text(content)
+        if blocks is not None:
+            blocks.extend(content)
+
+    def _request(self, model: str, system: List[Dict[str, Any]], messages: List[Dict[str, Any]],
+                 tools: Optional[List[Dict[str, Any]]],
+                 tool_choice: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the keyword arguments for an LLM request."""
+        request = {"model": model, "max_tokens": 1024, "system": system, "messages": messages}
+        if tools:
+            request["tools"] = tools
+            if tool_choice:
+                request["tool_choice"] = tool_choice
+        return request
+
+    def _create_system_prompt(self) -> str:
+        """Create the system prompt for the LLM with MCP context."""
+        instructions = _TOOL_INSTRUCTIONS if self.native_tools else _PROMPT_INSTRUCTIONS
+        return "".join((_PROMPT_PREFIX, self._mcp_context_str, instructions))
+
+    def _create_results_instructions(self) -> str:
+        """Create the system instructions for responding to function call results."""
+        return _RESULTS_INSTRUCTIONS
+
+    def _create_results_prompt(self, query: str, results: List[Dict[str, Any]]) -> str:
+        """Create a user message that includes function call results."""
+        prompt = b"".join(
+            (_RESULTS_PREFIX, _dumps_bytes(results), _QUERY_PREFIX, query.encode(), _RESPONSE_SUFFIX)
+        )
+        # The SDK only accepts str content, so decode once at the boundary
+        return prompt.decode()
 
     def _extract_function_calls(self, text: str) -> List[Dict[str, Any]]:
         """Extract function calls from the assistant's response."""
-        import re
-
         function_calls = []
-        pattern = r'<function_call>(.*?)</function_call>'
-        matches = re.findall(pattern, text, re.DOTALL)
-
-        for match in matches:
+        for match in _FUNCALL_RE.finditer(text):
+            # Skip anything that cannot be a JSON object before paying for a parse error
+            candidate = match.group(1).strip()
+            if not candidate or candidate[0] != "{" or candidate[-1] != "}":
+                continue
             try:
-                function_call = json.loads(match.strip())
+                function_call = orjson.loads(candidate)
                 function_calls.append(function_call)
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 # Invalid JSON, skip this match
                 continue
 
         return function_calls
 
 
-# Example usage
-if __name__ == "__main__":
-    agent = MCPAgent()
-
+async def main():
     # Example queries
     queries = [
         "Please summarize water use in the state of PA in 2015?",
@@ -145,9 +554,16 @@ if __name__ == "__main__":
         "How does water usage vary seasonally in Washington DC?",
     ]
 
-    for query in queries:
+    # The queries are independent, so run each on its own agent (and history) concurrently
+    responses = await asyncio.gather(*[MCPAgent().process_query(query) for query in queries])
+
+    for query, response in zip(queries, responses):
         print(f"\nQUERY: {query}")
         print("-" * 50)
-        response = agent.process_query(query)
         print(f"RESPONSE:\n{response}")
-        print("=" * 80)
\ No newline at end of file
+        print("=" * 80)
+
+
+# Example usage
+if __name__ == "__main__":
+    asyncio.run(main())
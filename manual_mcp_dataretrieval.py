@@ -1,348 +1,719 @@
-import json
-from typing import Dict, List, Any, Optional, Union
-import dataretrieval.nwis as nwis
-import pandas as pd
-
-class MCPDataRetrieval:
-    """
-    Model Context Protocol (MCP) wrapper for the dataretrieval Python library.
-    This wrapper provides MCP-compliant interfaces to access USGS water data.
+from __future__ import annotations
 
-    The class encapsulates various methods to retrieve water data from USGS
-    and formats the responses according to the MCP specification.
+import asyncio
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+import orjson
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+from _mcp_common import POOL_SIZE, SESSION, arrow_payload, install_session, json_default, prune_columns, rows
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas and dataretrieval are imported on first use, so processes that only
+# list the MCP functions do not pay for importing them
+_pd_module = None
+_nwis_module = None
+
+
+def _pd():
+    """Import pandas on first use."""
+    global _pd_module
+    if _pd_module is None:
+        import pandas
+        # Copy-on-Write turns the column slices taken while pruning into lazy views and
+        # protects the shared frames in the reference cache from accidental mutation
+        pandas.set_option("mode.copy_on_write", True)
+        _pd_module = pandas
+    return _pd_module
+
+
+def _nwis():
+    """Import dataretrieval.nwis on first use."""
+    global _nwis_module
+    if _nwis_module is None:
+        _pd()
+        import dataretrieval.nwis
+        install_session()
+        _nwis_module = dataretrieval.nwis
+    return _nwis_module
+
+_WATERSERVICES_URL = "https://waterservices.usgs.gov/nwis/"
+
+# Long date ranges are fetched as concurrent windows of this many years, and
+# long site lists as concurrent batches of at most this many sites
+_WINDOW_YEARS = 1
+_SITE_BATCH = 100
+_FETCH_POOL = ThreadPoolExecutor(max_workers=8)
+# Whole function calls awaited through acall_function run here: the default
+# executor behind asyncio.to_thread has only min(32, cpu_count + 4) threads, and
+# _FETCH_POOL is kept for the fan-out inside a call so a call never waits on
+# parts queued behind other calls in its own pool
+_CALL_POOL = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="mcp-call")
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
+
+# Site descriptions, parameter codes and rating tables change rarely, so the
+# cleaned DataFrames are kept for a day; callers must treat them as read-only
+_REFERENCE_CACHE = TTLCache(maxsize=512, ttl=24*60*60)
+_REFERENCE_LOCK = threading.Lock()
+
+
+def _arrow_prune_rows(df: pd.DataFrame) -> Optional[Tuple[List[Any], int, List[Sequence[Any]]]]:
+    """Prune and convert a mixed-dtype frame to rows in one pyarrow pass, or None to use pandas."""
+    # numeric-only frames prune and convert faster through pandas, and Arrow
+    # tables cannot hold duplicate column labels
+    if not (df.dtypes == object).any() or not df.columns.is_unique:
+        return None
+    try:
+        # Optional dependency, install with the "arrow" extra
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return None
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # e.g. an object column mixing numbers and strings
+        return None
+    keep = []
+    for i, column in enumerate(table.columns):
+        if column.null_count == len(column):
+            continue
+        # nulls count as values here, as they do in the pandas path
+        if (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)) \
+                and not pc.any(pc.fill_null(pc.not_equal(column, "-"), True)).as_py():
+            continue
+        keep.append(i)
+    table = table.select(keep)
+    data = list(zip(*(column.to_pylist() for column in table.columns)))
+    return df.columns[keep].tolist(), table.num_rows, data
+
+
+def _date_windows(start: str, end: str, years: int = _WINDOW_YEARS) -> List[Tuple[str, str]]:
+    """Split an inclusive date range into consecutive windows of at most `years` years.
+
+    The first window starts at `start` and the last ends at `end` exactly as given,
+    so ISO timestamps keep their time part; the inner boundaries are whole days.
+    An inverted range yields no windows.
     """
-
-    def __init__(self):
-        """Initialize the function mapping dictionary."""
-        self.functions = {
-            "get_site_data": self.get_site_data,
-            "get_daily_values": self.get_daily_values,
-            "get_instantaneous_values": self.get_instantaneous_values,
-            "get_discharge_measurements": self.get_discharge_measurements,
-            "get_discharge_peaks": self.get_discharge_peaks,
-            "get_gwlevels": self.get_gwlevels,
-            "get_info": self.get_info,
-            "get_pmcodes": self.get_pmcodes,
-            "get_ratings": self.get_ratings,
-            "get_record": self.get_record,
-            "get_stats": self.get_stats,
-            "get_water_use": self.get_water_use,
-            "what_sites": self.what_sites
-        }
-
-    def get_mcp_functions(self) -> List[Dict[str, Any]]:
-        """
-        Returns the MCP-compliant function definitions.
-
-        Returns:
-            List[Dict[str, Any]]: List of function definitions in MCP format
-        """
-        return [
-            {
-                "name": "get_site_data",
-                "description": "Get information about a specific USGS water monitoring site",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "site_code": {
-                            "type": "string",
-                            "description": "USGS site code (e.g., '09380000')"
-                        }
-                    },
-                    "required": ["site_code"]
-                }
-            },
-            {
-                "name": "get_daily_values",
-                "description": "Get daily values of water data",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "site_code": {
-                            "type": "string",
-                            "description": "USGS site code"
-                        },
-                        "parameter_code": {
-                            "type": "string",
-                            "description": "USGS parameter code (e.g., '00060' for discharge)"
-                        },
-                        "statCd": {
-                            "type": "string",
-                            "description": "USGS statistic code"
-                        },
-                        "start_date": {
-                            "type": "string",
-                            "description": "Start date in YYYY-MM-DD format"
-                        },
-                        "end_date": {
-                            "type": "string",
-                            "description": "End date in YYYY-MM-DD format"
-                        }
-                    },
-                    "required": ["site_code"]
-                }
-            },
-            {
-                "name": "get_instantaneous_values",
-                "description": "Get instantaneous values of water data",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "site_code": {
-                            "type": "string",
-                            "description": "USGS site code"
-                        },
-                        "parameter_code": {
-                            "type": "string",
-                            "description": "USGS parameter code (e.g., '00060' for discharge)"
-                        },
-                        "start_date": {
-                            "type": "string",
-                            "description": "Start date in YYYY-MM-DD format"
-                        },
-                        "end_date": {
-                            "type": "string",
-                            "description": "End date in YYYY-MM-DD format"
-                        }
-                    },
-                    "required": ["site_code", "parameter_code"]
+    pd = _pd()
+    start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+    if start_ts > end_ts:
+        return []
+    step = pd.DateOffset(years=years)
+    window_starts = pd.date_range(start_ts.normalize(), end_ts, freq=step)
+    windows = []
+    for i, window_start in enumerate(window_starts):
+        first, last = i == 0, i == len(window_starts) - 1
+        windows.append((
+            start if first else window_start.strftime("%Y-%m-%d"),
+            end if last else (window_starts[i + 1] - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        ))
+    return windows
+
+
+def _fetch_parts(fetch: Callable[[Any, Optional[str], Optional[str]], pd.DataFrame],
+                 sites: Any, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+    """Call fetch(sites, start, end) concurrently over site batches and yearly windows and concatenate the frames."""
+    if isinstance(sites, list) and len(sites) > _SITE_BATCH:
+        batches = [sites[i:i + _SITE_BATCH] for i in range(0, len(sites), _SITE_BATCH)]
+    else:
+        batches = [sites]
+    windows = _date_windows(start, end) if start and end else []
+    if not windows:
+        # no range to split, or an inverted one that NWIS itself reports on
+        windows = [(start, end)]
+    if len(batches) == 1 and len(windows) == 1:
+        return fetch(sites, start, end)
+    # one flat fan-out; pool tasks never wait on other pool tasks
+    from dataretrieval.utils import NoSitesError
+
+    futures = [_FETCH_POOL.submit(fetch, batch, window_start, window_end)
+               for batch in batches for window_start, window_end in windows]
+    frames, empty = [], None
+    for future in futures:
+        try:
+            frames.append(future.result())
+        except NoSitesError as e:
+            # a part without data is not an error as long as another part has some
+            empty = e
+    if not frames:
+        raise empty
+    return _pd().concat(frames, copy=False)
+
+
+def _rdb_chunks(stream: io.BufferedReader, names: List[str], types: List[str], chunksize: int) -> Iterator[pd.DataFrame]:
+    """Parse the data rows of an RDB stream into DataFrames of roughly `chunksize` rows."""
+    if not stream.peek(1):
+        # header only, no data rows
+        return
+    try:
+        # Optional dependency, install with the "arrow" extra
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        # the width/type row marks numeric columns with 'n'; everything else
+        # (site numbers, dates, codes) stays text
+        dtype = {name: str for name, spec in zip(names, types) if not spec.endswith("n")}
+        text = io.TextIOWrapper(stream, encoding="utf-8")
+        yield from _pd().read_csv(text, sep="\t", comment="#", names=names, dtype=dtype, chunksize=chunksize)
+        return
+    # pyarrow's multithreaded reader tokenizes whole blocks in C; every column is
+    # read as text (numeric columns are converted after concatenation) so a
+    # qualifier such as 'Ice' in a later block cannot break type inference
+    reader = pa_csv.open_csv(
+        stream,
+        # blocks are sized in bytes; RDB rows are typically well under 64 bytes
+        read_options=pa_csv.ReadOptions(column_names=names, use_threads=True, block_size=max(chunksize * 64, 1 << 20)),
+        parse_options=pa_csv.ParseOptions(
+            delimiter="\t",
+            invalid_row_handler=lambda row: "skip" if row.text and row.text.startswith("#") else "error"
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in names},
+            strings_can_be_null=True
+        )
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def _stream_rdb(service: str, params: Dict[str, Any], chunksize: int) -> pd.DataFrame:
+    """Stream an RDB response from waterservices and parse it in chunks of rows."""
+    pd = _pd()
+    # NWIS repeats the comment block, header and type rows for every site, which
+    # a single-schema chunked reader cannot follow
+    sites = params.get("sites")
+    if isinstance(sites, str):
+        sites = sites.split(",")
+    if sites is not None and len(sites) > 1:
+        raise ValueError("chunksize streaming supports a single site per request")
+    payload = {k: v for k, v in params.items() if v is not None}
+    payload["format"] = "rdb"
+    with SESSION.get(_WATERSERVICES_URL + service + "/", params=payload, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        stream = io.BufferedReader(response.raw)
+        line = stream.readline()
+        while line.startswith(b"#"):
+            line = stream.readline()
+        names = line.decode("utf-8").rstrip("\r\n").split("\t")
+        types = stream.readline().decode("utf-8").rstrip("\r\n").split("\t")
+        # all-NaN columns are dropped per chunk to bound memory; concat restores
+        # any that have values in other chunks, so the final prune is exact
+        chunks = []
+        for chunk in _rdb_chunks(stream, names, types, chunksize):
+            if (chunk.iloc[:, 0] == names[0]).any():
+                # a repeated header row starts another section (e.g. another time series)
+                raise ValueError("RDB response has more than one section; request it without chunksize")
+            chunks.append(chunk.dropna(axis=1, how='all'))
+    chunks = [chunk for chunk in chunks if not chunk.empty]
+    if not chunks:
+        return pd.DataFrame(columns=names)
+    df = pd.concat(chunks, ignore_index=True, copy=False)
+    df = prune_columns(df[[name for name in names if name in df.columns]])
+    # numeric columns that are still text (pyarrow path) are converted once; as
+    # with pandas, non-numeric codes such as 'Ice' are kept next to the numbers
+    converted = {}
+    for name, spec in zip(names, types):
+        if spec.endswith("n") and name in df.columns and df[name].dtype == object:
+            numbers = pd.to_numeric(df[name], errors="coerce")
+            parsed = numbers.notna() | df[name].isna()
+            converted[name] = numbers if parsed.all() else numbers.astype(object).where(parsed, df[name])
+    if converted:
+        df = df.assign(**converted)
+    # date/time columns ('d' in the type row) are parsed once over the whole
+    # column with a fixed ISO format rather than inferred per value or chunk
+    dates = [name for name, spec in zip(names, types) if spec.endswith("d") and name in df.columns]
+    if dates:
+        df = df.assign(**{name: pd.to_datetime(df[name], format="ISO8601", errors="coerce") for name in dates})
+    return df
+
+
+@cached(_REFERENCE_CACHE, key=lambda site_code: hashkey("site", site_code), lock=_REFERENCE_LOCK)
+def _cached_site(site_code: str) -> pd.DataFrame:
+    """Fetch and clean the site description for a single site."""
+    return prune_columns(_nwis().get_record(sites=site_code, service="site"))
+
+
+@cached(_REFERENCE_CACHE, key=lambda params_key: hashkey("info", params_key), lock=_REFERENCE_LOCK)
+def _cached_info(params_key: str) -> pd.DataFrame:
+    """Fetch and clean site information for a canonical JSON encoding of the query."""
+    params = json.loads(params_key)
+    sites = params.get("sites")
+    if isinstance(sites, str):
+        sites = sites.split(",")
+
+    def fetch(sites, start, end):
+        query = params if sites is None else {**params, "sites": sites}
+        return _nwis().get_info(**query)[0]
+
+    return prune_columns(_fetch_parts(fetch, sites, None, None))
+
+
+@cached(_REFERENCE_CACHE, key=lambda parameterCd: hashkey("pmcodes", parameterCd), lock=_REFERENCE_LOCK)
+def _cached_pmcodes(parameterCd: str) -> pd.DataFrame:
+    """Fetch and clean the parameter code table."""
+    df, md = _nwis().get_pmcodes(parameterCd=parameterCd)
+    return prune_columns(df)
+
+
+@cached(_REFERENCE_CACHE, key=lambda site, file_type: hashkey("ratings", site, file_type), lock=_REFERENCE_LOCK)
+def _cached_ratings(site: str, file_type: str) -> pd.DataFrame:
+    """Fetch and clean a rating table."""
+    df, md = _nwis().get_ratings(site=site, file_type=file_type)
+    return prune_columns(df)
+
+
+# MCP function definitions; built once and shared, so callers must not mutate them.
+# They are handed to the LLM as-is, so programmatic-only options (chunksize and
+# format) are documented on the methods rather than listed here
+_MCP_FUNCTIONS = [
+    {
+        "name": "get_site_data",
+        "description": "Get information about a specific USGS water monitoring site",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "site_code": {
+                    "type": "string",
+                    "description": "USGS site code (e.g., '09380000')"
                 }
             },
-            {
-                "name": "get_discharge_measurements",
-                "description": "Get discharge measurements from the waterdata service",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "sites": {
-                            "type": "string",
-                            "description": "USGS site code(s)"
-                        },
-                        "start": {
-                            "type": "string",
-                            "description": "Start date in YYYY-MM-DD format"
-                        },
-                        "end": {
-                            "type": "string",
-                            "description": "End date in YYYY-MM-DD format"
-                        }
-                    },
-                    "required": ["sites"]
+            "required": ["site_code"]
+        }
+    },
+    {
+        "name": "get_daily_values",
+        "description": "Get daily values of water data",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "site_code": {
+                    "type": "string",
+                    "description": "USGS site code"
+                },
+                "parameter_code": {
+                    "type": "string",
+                    "description": "USGS parameter code (e.g., '00060' for discharge)"
+                },
+                "statCd": {
+                    "type": "string",
+                    "description": "USGS statistic code"
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format"
                 }
             },
-            {
-                "name": "get_discharge_peaks",
-                "description": "Get discharge peaks from the waterdata service",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "sites": {
-                            "type": "string",
-                            "description": "USGS site code(s)"
-                        },
-                        "start": {
-                            "type": "string",
-                            "description": "Start date in YYYY-MM-DD format"
-                        },
-                        "end": {
-                            "type": "string",
-                            "description": "End date in YYYY-MM-DD format"
-                        }
-                    },
-                    "required": ["sites"]
+            "required": ["site_code"]
+        }
+    },
+    {
+        "name": "get_instantaneous_values",
+        "description": "Get instantaneous values of water data",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "site_code": {
+                    "type": "string",
+                    "description": "USGS site code"
+                },
+                "parameter_code": {
+                    "type": "string",
+                    "description": "USGS parameter code (e.g., '00060' for discharge)"
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format"
                 }
             },
-            {
-                "name": "get_gwlevels",
-                "description": "Get groundwater levels from the waterdata service",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "sites": {
-                            "type": "string",
-                            "description": "USGS site code(s)"
-                        },
-                        "start": {
-                            "type": "string",
-                            "description": "Start date in YYYY-MM-DD format"
-                        },
-                        "end": {
-                            "type": "string",
-                            "description": "End date in YYYY-MM-DD format"
-                        }
-                    },
-                    "required": ["sites"]
+            "required": ["site_code", "parameter_code"]
+        }
+    },
+    {
+        "name": "get_discharge_measurements",
+        "description": "Get discharge measurements from the waterdata service",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sites": {
+                    "type": "string",
+                    "description": "USGS site code(s)"
+                },
+                "start": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format"
+                },
+                "end": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format"
                 }
             },
-            {
-                "name": "get_ratings",
-                "description": "Get rating table for an active USGS streamgage",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "site": {
-                            "type": "string",
-                            "description": "USGS site code"
-                        },
-                        "file_type": {
-                            "type": "string",
-                            "description": "File type (base, corr, exsa)",
-                            "default": "base"
-                        }
-                    },
-                    "required": ["site"]
+            "required": ["sites"]
+        }
+    },
+    {
+        "name": "get_discharge_peaks",
+        "description": "Get discharge peaks from the waterdata service",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sites": {
+                    "type": "string",
+                    "description": "USGS site code(s)"
+                },
+                "start": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format"
+                },
+                "end": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format"
                 }
             },
-            {
-                "name": "what_sites",
-                "description": "Search NWIS for sites within a region with specific data",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "stateCd": {
-                            "type": "string",
-                            "description": "Two-letter state code (e.g., 'CA')"
-                        },
-                        "siteType": {
-                            "type": "string",
-                            "description": "Type of site (e.g., 'ST' for stream)"
-                        },
-                        "county": {
-                            "type": "string",
-                            "description": "County code"
-                        },
-                        "huc": {
-                            "type": "string",
-                            "description": "Hydrologic Unit Code"
-                        }
-                    }
+            "required": ["sites"]
+        }
+    },
+    {
+        "name": "get_gwlevels",
+        "description": "Get groundwater levels from the waterdata service",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sites": {
+                    "type": "string",
+                    "description": "USGS site code(s)"
+                },
+                "start": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format"
+                },
+                "end": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format"
                 }
             },
-            {
-                "name": "get_stats",
-                "description": "Get water services statistics information",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "sites": {
-                            "type": "string",
-                            "description": "USGS site code(s)"
-                        },
-                        "parameterCd": {
-                            "type": "string",
-                            "description": "USGS parameter code (e.g., '00060' for discharge)"
-                        },
-                        "statReportType": {
-                            "type": "string",
-                            "description": "Type of statistical report"
-                        },
-                        "statTypeCd": {
-                            "type": "string",
-                            "description": "Type of statistical data"
-                        },
-                    }
+            "required": ["sites"]
+        }
+    },
+    {
+        "name": "get_ratings",
+        "description": "Get rating table for an active USGS streamgage",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "site": {
+                    "type": "string",
+                    "description": "USGS site code"
+                },
+                "file_type": {
+                    "type": "string",
+                    "description": "File type (base, corr, exsa)",
+                    "default": "base"
                 }
             },
-            {
-                "name": "get_info",
-                "description": "Get site description information from NWIS",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "sites": {
-                            "type": "string",
-                            "description": "USGS site code(s)"
-                        },
-                        "stateCd": {
-                            "type": "string",
-                            "description": "Two-letter state code (e.g., 'CA')"
-                        },
-                        "huc": {
-                            "type": "string",
-                            "description": "Hydrologic Unit Code(s)"
-                        },
-                        "bBox": {
-                            "type": "string",
-                            "description": "Bounding box coordinates (minx,miny,maxx,maxy)"
-                        },
-                        "countyCd": {
-                            "type": "string",
-                            "description": "County code(s)"
-                        },
-                        "startDt": {
-                            "type": "string",
-                            "description": "Start date in YYYY-MM-DD format"
-                        },
-                        "endDt": {
-                            "type": "string",
-                            "description": "End date in YYYY-MM-DD format"
-                        },
-                        "period": {
-                            "type": "string",
-                            "description": "Period of record (e.g., 'P7D' for 7 days)"
-                        },
-                        "modifiedSince": {
-                            "type": "string",
-                            "description": "Modified since date in YYYY-MM-DD format"
-                        },
-                        "parameterCd": {
-                            "type": "string",
-                            "description": "USGS parameter code (e.g., '00060' for discharge)"
-                        },
-                        "siteType": {
-                            "type": "string",
-                            "description": "Type of site (e.g., 'ST' for stream)"
-                        },
-                        "siteOutput": {
-                            "type": "string",
-                            "description": "Site output format"
-                        },
-                        "seriesCatalogOutput": {
-                            "type": "string",
-                            "description": "Series catalog output format"
-                        },
-                    }
+            "required": ["site"]
+        }
+    },
+    {
+        "name": "what_sites",
+        "description": "Search NWIS for sites within a region with specific data",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "stateCd": {
+                    "type": "string",
+                    "description": "Two-letter state code (e.g., 'CA')"
+                },
+                "siteType": {
+                    "type": "string",
+                    "description": "Type of site (e.g., 'ST' for stream)"
+                },
+                "county": {
+                    "type": "string",
+                    "description": "County code"
+                },
+                "huc": {
+                    "type": "string",
+                    "description": "Hydrologic Unit Code"
                 }
-            },
-            {
-                "name": "get_pmcodes",
-                "description": "Get NWIS parameter codes",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "parameterCd": {
-                            "type": "string",
-                            "description": "USGS parameter code"
-                        }
-                    }
+            }
+        }
+    },
+    {
+        "name": "get_stats",
+        "description": "Get water services statistics information",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sites": {
+                    "type": "string",
+                    "description": "USGS site code(s)"
+                },
+                "parameterCd": {
+                    "type": "string",
+                    "description": "USGS parameter code (e.g., '00060' for discharge)"
+                },
+                "statReportType": {
+                    "type": "string",
+                    "description": "Type of statistical report"
+                },
+                "statTypeCd": {
+                    "type": "string",
+                    "description": "Type of statistical data"
+                },
+            }
+        }
+    },
+    {
+        "name": "get_info",
+        "description": "Get site description information from NWIS",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sites": {
+                    "type": "string",
+                    "description": "USGS site code(s)"
+                },
+                "stateCd": {
+                    "type": "string",
+                    "description": "Two-letter state code (e.g., 'CA')"
+                },
+                "huc": {
+                    "type": "string",
+                    "description": "Hydrologic Unit Code(s)"
+                },
+                "bBox": {
+                    "type": "string",
+                    "description": "Bounding box coordinates (minx,miny,maxx,maxy)"
+                },
+                "countyCd": {
+                    "type": "string",
+                    "description": "County code(s)"
+                },
+                "startDt": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format"
+                },
+                "endDt": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format"
+                },
+                "period": {
+                    "type": "string",
+                    "description": "Period of record (e.g., 'P7D' for 7 days)"
+                },
+                "modifiedSince": {
+                    "type": "string",
+                    "description": "Modified since date in YYYY-MM-DD format"
+                },
+                "parameterCd": {
+                    "type": "string",
+                    "description": "USGS parameter code (e.g., '00060' for discharge)"
+                },
+                "siteType": {
+                    "type": "string",
+                    "description": "Type of site (e.g., 'ST' for stream)"
+                },
+                "siteOutput": {
+                    "type": "string",
+                    "description": "Site output format"
+                },
+                "seriesCatalogOutput": {
+                    "type": "string",
+                    "description": "Series catalog output format"
+                },
+            }
+        }
+    },
+    {
+        "name": "get_pmcodes",
+        "description": "Get NWIS parameter codes",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "parameterCd": {
+                    "type": "string",
+                    "description": "USGS parameter code"
                 }
-            },
-            {
-                "name": "get_water_use",
-                "description": "Get water use data from USGS (NWIS)",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "years": {
-                            "type": "string",
-                            "description": "Years to retrieve data for"
-                        },
-                        "state": {
-                            "type": "string",
-                            "description": "Two-letter state code (e.g., 'CA')"
-                        },
-                        "counties": {
-                            "type": "string",
-                            "description": "County codes"
-                        },
-                        "categories": {
-                            "type": "string",
-                            "description": "Water use categories"
-                        }
-                    }
+            }
+        }
+    },
+    {
+        "name": "get_water_use",
+        "description": "Get water use data from USGS (NWIS)",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "years": {
+                    "type": "string",
+                    "description": "Years to retrieve data for"
+                },
+                "state": {
+                    "type": "string",
+                    "description": "Two-letter state code (e.g., 'CA')"
+                },
+                "counties": {
+                    "type": "string",
+                    "description": "County codes"
+                },
+                "categories": {
+                    "type": "string",
+                    "description": "Water use categories"
                 }
             }
-        ]
+        }
+    }
+]
+
+# Context metadata; format_mcp_context hands out shallow copies
+_METADATA = {
+    "source": "USGS Water Data",
+    "description": "Data retrieval interface for USGS water data through dataretrieval library",
+    "version": "1.0.0",
+    "documentation_url": "https://doi-usgs.github.io/dataretrieval/index.html"
+}
+
+
+class _Spec(NamedTuple):
+    """How a function fetches its DataFrame and words its response."""
+    fetch: str
+    message: str
+    empty: Optional[str] = None
+    error: str = ""
+    cleaned: bool = False
+    arrow: bool = False
+
+
+class MCPDataRetrieval:
+    """
+    Model Context Protocol (MCP) wrapper for the dataretrieval Python library.
+    This wrapper provides MCP-compliant interfaces to access USGS water data.
+
+    The class encapsulates various methods to retrieve water data from USGS
+    and formats the responses according to the MCP specification.
+    """
+
+    __slots__ = ("_functions",)
+
+    # Callable function names, bound once per instance into the dispatch table
+    _FUNC_ORDER = (
+        "get_site_data",
+        "get_daily_values",
+        "get_instantaneous_values",
+        "get_discharge_measurements",
+        "get_discharge_peaks",
+        "get_gwlevels",
+        "get_info",
+        "get_pmcodes",
+        "get_ratings",
+        "get_record",
+        "get_stats",
+        "get_water_use",
+        "what_sites"
+    )
+    _UNKNOWN_FUNCTION = "Function '{}' not found. Available functions: " + ", ".join(_FUNC_ORDER)
+
+    # Parameters that must all be present, and groups of which at least one must be
+    _REQUIRED = {
+        "get_site_data": frozenset({"site_code"}),
+        "get_daily_values": frozenset({"site_code"}),
+        "get_instantaneous_values": frozenset({"site_code", "parameter_code"}),
+        "get_discharge_measurements": frozenset({"sites"}),
+        "get_discharge_peaks": frozenset({"sites"}),
+        "get_gwlevels": frozenset({"sites"}),
+        "get_pmcodes": frozenset({"parameterCd"}),
+        "get_ratings": frozenset({"site"})
+    }
+    # Keys forwarded to nwis by get_info (its schema properties); the other
+    # functions that pass params through as kwargs forward everything but the
+    # keys in _DENIED_KEYS
+    _ALLOWED_KEYS = {
+        "get_info": frozenset(next(f for f in _MCP_FUNCTIONS if f["name"] == "get_info")["parameters"]["properties"])
+    }
+    # Keys never forwarded to nwis: ssl_check is not accepted from callers, and
+    # format/chunksize select how this wrapper fetches and returns the data
+    _DENIED_KEYS = frozenset({"ssl_check", "format", "chunksize"})
+    _ANY_OF = {
+        "get_info": frozenset({
+            "sites", "stateCd", "huc", "bBox", "countyCd", "startDt", "endDt",
+            "period", "modifiedSince", "parameterCd", "siteType"
+        }),
+        "get_water_use": frozenset({"years", "state", "counties", "categories"})
+    }
+
+    # How each function fetches its frame and words its response: `empty` is the
+    # error returned for an empty result (None to return it as a success), `error`
+    # prefixes exception messages, `cleaned` marks fetches from the reference
+    # cache, which already hold pruned frames, and `arrow` marks the functions that
+    # honour format='arrow'
+    _SPECS = {
+        "get_site_data": _Spec(
+            "_fetch_site_data", "Successfully retrieved data for site {site_code}",
+            empty="No data found for site {site_code}", error="Error retrieving site data: ", cleaned=True
+        ),
+        "get_daily_values": _Spec(
+            "_fetch_daily_values", "Successfully retrieved daily values for site {site_code}",
+            empty="No daily values found for the specified parameters", error="Error retrieving daily values: ",
+            arrow=True
+        ),
+        "get_instantaneous_values": _Spec(
+            "_fetch_instantaneous_values", "Successfully retrieved instantaneous values for site {site_code}",
+            empty="No instantaneous values found for the specified parameters",
+            error="Error retrieving instantaneous values: ", arrow=True
+        ),
+        "get_discharge_measurements": _Spec(
+            "_fetch_discharge_measurements", "Retrieved {n} discharge measurements", arrow=True
+        ),
+        "get_discharge_peaks": _Spec("_fetch_discharge_peaks", "Retrieved {n} discharge peaks"),
+        "get_gwlevels": _Spec("_fetch_gwlevels", "Retrieved {n} groundwater level records"),
+        "get_info": _Spec("_fetch_info", "Retrieved site information", cleaned=True),
+        "get_pmcodes": _Spec("_fetch_pmcodes", "Retrieved {n} parameter codes", cleaned=True),
+        "get_ratings": _Spec("_fetch_ratings", "Retrieved {n} rating records for site {site}", cleaned=True),
+        "get_record": _Spec("_fetch_record", "Retrieved {n} records"),
+        "get_stats": _Spec("_fetch_stats", "Retrieved statistical data"),
+        "get_water_use": _Spec("_fetch_water_use", "Retrieved water use data"),
+        "what_sites": _Spec("_fetch_what_sites", "Found {n} sites matching the criteria")
+    }
+
+    def __init__(self):
+        """Initialize the function dispatch table."""
+        self._functions = MappingProxyType({name: getattr(self, name) for name in self._FUNC_ORDER})
+
+    @property
+    def functions(self) -> MappingProxyType:
+        """
+        Read-only mapping of function names to bound methods.
+
+        Returns:
+            MappingProxyType: Function name to callable
+        """
+        return self._functions
+
+    def get_mcp_functions(self) -> List[Dict[str, Any]]:
+        """
+        Returns the MCP-compliant function definitions.
+
+        Returns:
+            List[Dict[str, Any]]: List of function definitions in MCP format
+        """
+        return _MCP_FUNCTIONS
 
     def _format_response(self, status: str, column_names: Any = None, data: Any = None, message: str = None, metadata: Any = None) -> Dict[str, Any]:
         """
@@ -374,97 +745,205 @@ class MCPDataRetrieval:
 
         return response
 
-    def get_site_data(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _ok(self, payload: Dict[str, Any], message: str) -> Dict[str, Any]:
         """
-        Get information about a specific USGS water monitoring site.
+        Build a success response from a serialized payload without per-field checks.
 
         Args:
-            params (Dict[str, Any]): Parameters containing site_code
+            payload (Dict[str, Any]): Fields from _df_to_payload
+            message (str): Message to include in the response
 
         Returns:
-            Dict[str, Any]: Response with site information
+            Dict[str, Any]: Formatted response
         """
-        site_code = params.get("site_code")
-        if not site_code:
-            return self._format_response("error", message="Site code is required")
+        return {"status": "success", **payload, "message": message}
 
-        try:
-            site_info = nwis.get_record(sites=site_code, service="site")
-            # drop columns with all NaN values
-            site_info.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            site_info = site_info.loc[:, (site_info != '-').any(axis=0)]
-
-            if not site_info.empty:
-                column_names = site_info.columns.tolist()
-                data_values = site_info.values.tolist()
-                return self._format_response(
-                    "success",
-                    column_names=column_names,
-                    data=data_values,
-                    message=f"Successfully retrieved data for site {site_code}"
-                )
-            else:
-                return self._format_response("error", message=f"No data found for site {site_code}")
-        except Exception as e:
-            return self._format_response("error", message=f"Error retrieving site data: {str(e)}")
+    def _err(self, message: str) -> Dict[str, Any]:
+        """
+        Build an error response.
 
+        Args:
+            message (str): Error message
 
-    def get_daily_values(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        Returns:
+            Dict[str, Any]: Formatted response
         """
-        Get daily values of water data.
+        return {"status": "error", "message": message}
+
+    def _df_to_payload(self, df: pd.DataFrame, response_format: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Convert a DataFrame into the column_names/data fields of a response.
 
         Args:
-            params (Dict[str, Any]): Parameters containing site_code, and optionally parameter_code, statCd, start_date, end_date
+            df (pd.DataFrame): Cleaned DataFrame to serialize
+            response_format (Optional[str], optional): 'arrow' for a base64 Arrow IPC
+                stream instead of row-major values
 
         Returns:
-            Dict[str, Any]: Response with daily values
+            Dict[str, Any]: Column names and data, plus format metadata for arrow
         """
-        site_code = params.get("site_code")
-        parameter_code = params.get("parameter_code")
-        statCd = params.get("statCd")
+        if response_format == "arrow":
+            return arrow_payload(df)
+        return {"data": rows(df), "column_names": df.columns.tolist()}
 
-        if not site_code:
-            return self._format_response(
-                "error",
-                message="site_code is required"
-            )
+    def _run(self, function_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fetch, clean and serialize the result of a function according to its spec.
 
-        start_date = params.get("start_date")
-        end_date = params.get("end_date")
+        Args:
+            function_name (str): Name of the function in _SPECS
+            params (Dict[str, Any]): Parameters passed to the function
 
+        Returns:
+            Dict[str, Any]: Formatted response
+        """
+        # every public method and call_function funnel through here, so both
+        # entry points reject missing parameters the same way
+        error = self._validate(function_name, params)
+        if error is not None:
+            return error
+        spec = self._SPECS[function_name]
+        response_format = params.get("format") if spec.arrow else None
         try:
-            daily_data, md = nwis.get_dv(
-                sites=site_code,
-                parameterCd=parameter_code,
-                statCd=statCd,
-                start=start_date,
-                end=end_date
-            )
-            # drop columns with all NaN values
-            daily_data.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            daily_data = daily_data.loc[:, (daily_data != '-').any(axis=0)]
-
-            if not daily_data.empty:
-                column_names = daily_data.columns.tolist()
-                data_values = daily_data.values.tolist()
-                return self._format_response(
-                    "success",
-                    column_names=column_names,
-                    data=data_values,
-                    message=f"Successfully retrieved daily values for site {site_code}"
-                )
+            df = getattr(self, spec.fetch)(params)
+            pruned = None
+            if not spec.cleaned and response_format != "arrow":
+                pruned = _arrow_prune_rows(df)
+            if pruned is not None:
+                column_names, n_rows, data = pruned
+                payload = {"data": data, "column_names": column_names}
+                empty = n_rows == 0 or not column_names
             else:
-                return self._format_response(
-                    "error",
-                    message="No daily values found for the specified parameters"
-                )
-        except Exception as e:
-            return self._format_response(
-                "error",
-                message=f"Error retrieving daily values: {str(e)}"
+                if not spec.cleaned:
+                    # drop columns with all NaN or all '-' values
+                    df = prune_columns(df)
+                payload = None
+                n_rows, empty = len(df), df.empty
+            if spec.empty is not None and empty:
+                return self._err(spec.empty.format_map(params))
+            return self._ok(
+                payload if payload is not None else self._df_to_payload(df, response_format),
+                spec.message.format_map({**params, "n": n_rows})
             )
+        except Exception as e:
+            return self._err(f"{spec.error}{str(e)}")
+
+    def _fetch_site_data(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch the cached site description."""
+        return _cached_site(params.get("site_code"))
+
+    def _fetch_daily_values(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch daily values, streaming the RDB response when chunksize is given."""
+        if params.get("chunksize"):
+            return _stream_rdb("dv", {
+                "sites": params.get("site_code"),
+                "parameterCd": params.get("parameter_code"),
+                "statCd": params.get("statCd"),
+                "startDT": params.get("start_date"),
+                "endDT": params.get("end_date")
+            }, int(params["chunksize"]))
+        return _fetch_parts(lambda sites, start, end: _nwis().get_dv(
+            sites=sites,
+            parameterCd=params.get("parameter_code"),
+            statCd=params.get("statCd"),
+            start=start,
+            end=end
+        )[0], params.get("site_code"), params.get("start_date"), params.get("end_date"))
+
+    def _fetch_instantaneous_values(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch instantaneous values, streaming the RDB response when chunksize is given."""
+        if params.get("chunksize"):
+            return _stream_rdb("iv", {
+                "sites": params.get("site_code"),
+                "parameterCd": params.get("parameter_code"),
+                "startDT": params.get("start_date"),
+                "endDT": params.get("end_date")
+            }, int(params["chunksize"]))
+        return _fetch_parts(lambda sites, start, end: _nwis().get_iv(
+            sites=sites,
+            parameterCd=params.get("parameter_code"),
+            start=start,
+            end=end
+        )[0], params.get("site_code"), params.get("start_date"), params.get("end_date"))
+
+    def _fetch_site_records(self, nwis_function: str, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch one of the per-site waterdata services over batched sites and windowed dates."""
+        sites = params.get("sites")
+        # split into list if comma-separated string
+        if isinstance(sites, str):
+            sites = sites.split(",")
+        fetch = getattr(_nwis(), nwis_function)
+        return _fetch_parts(lambda sites, start, end: fetch(sites=sites, start=start, end=end)[0],
+                            sites, params.get("start"), params.get("end"))
+
+    def _fetch_discharge_measurements(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch discharge measurements."""
+        return self._fetch_site_records("get_discharge_measurements", params)
+
+    def _fetch_discharge_peaks(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch discharge peaks."""
+        return self._fetch_site_records("get_discharge_peaks", params)
+
+    def _fetch_gwlevels(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch groundwater levels."""
+        return self._fetch_site_records("get_gwlevels", params)
+
+    def _fetch_info(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch cached site information for the whitelisted query."""
+        return _cached_info(json.dumps(self._nwis_kwargs("get_info", params), sort_keys=True))
+
+    def _fetch_pmcodes(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch the cached parameter code table."""
+        return _cached_pmcodes(params.get("parameterCd"))
+
+    def _fetch_ratings(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch a cached rating table."""
+        return _cached_ratings(params.get("site"), params.get("file_type", "base"))
+
+    def _fetch_record(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch data from any NWIS service."""
+        return _nwis().get_record(**self._nwis_kwargs("get_record", params))
+
+    def _fetch_stats(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch water services statistics."""
+        df, md = _nwis().get_stats(**self._nwis_kwargs("get_stats", params))
+        return df
+
+    def _fetch_water_use(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Fetch water use data without the state and county code columns."""
+        df, md = _nwis().get_water_use(**self._nwis_kwargs("get_water_use", params))
+        # drop some extra columns
+        return df.drop(columns=['state_cd', 'county_cd'], errors='ignore')
+
+    def _fetch_what_sites(self, params: Dict[str, Any]) -> pd.DataFrame:
+        """Search for sites."""
+        df, md = _nwis().what_sites(**self._nwis_kwargs("what_sites", params))
+        return df
+
+    def get_site_data(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get information about a specific USGS water monitoring site.
+
+        Args:
+            params (Dict[str, Any]): Parameters containing site_code
+
+        Returns:
+            Dict[str, Any]: Response with site information
+        """
+        return self._run("get_site_data", params)
+
+    def get_daily_values(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get daily values of water data.
+
+        Args:
+            params (Dict[str, Any]): Parameters containing site_code, and optionally parameter_code, statCd, start_date, end_date,
+                                     chunksize to stream the RDB response of a single site, and format ('json' or 'arrow')
+
+        Returns:
+            Dict[str, Any]: Response with daily values
+        """
+        return self._run("get_daily_values", params)
 
     def get_instantaneous_values(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -472,53 +951,13 @@ class MCPDataRetrieval:
 
         Args:
             params (Dict[str, Any]): Parameters containing site_code, parameter_code,
-                                     start_date, and end_date
+                                     start_date, and end_date, and optionally chunksize
+                                     to stream the RDB response of a single site and format ('json' or 'arrow')
 
         Returns:
             Dict[str, Any]: Response with instantaneous values
         """
-        site_code = params.get("site_code")
-        parameter_code = params.get("parameter_code")
-        start_date = params.get("start_date")
-        end_date = params.get("end_date")
-
-        if not all([site_code, parameter_code]):
-            return self._format_response(
-                "error",
-                message="site_code and parameter_code are both required"
-            )
-
-        try:
-            iv_data, md = nwis.get_iv(
-                sites=site_code,
-                parameterCd=parameter_code,
-                start=start_date,
-                end=end_date
-            )
-            # drop columns with all NaN values
-            iv_data.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            iv_data = iv_data.loc[:, (iv_data != '-').any(axis=0)]
-
-            if not iv_data.empty:
-                column_names = iv_data.columns.tolist()
-                data_values = iv_data.values.tolist()
-                return self._format_response(
-                    "success",
-                    column_names=column_names,
-                    data=data_values,
-                    message=f"Successfully retrieved instantaneous values for site {site_code}"
-                )
-            else:
-                return self._format_response(
-                    "error",
-                    message="No instantaneous values found for the specified parameters"
-                )
-        except Exception as e:
-            return self._format_response(
-                "error",
-                message=f"Error retrieving instantaneous values: {str(e)}"
-            )
+        return self._run("get_instantaneous_values", params)
 
     def get_discharge_measurements(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -526,38 +965,12 @@ class MCPDataRetrieval:
 
         Args:
             params (Dict[str, Any]): Parameters containing sites and optionally
-                                     start and end dates
+                                     start and end dates and format ('json' or 'arrow')
 
         Returns:
             Dict[str, Any]: Response with discharge measurements
         """
-        sites = params.get("sites")
-        # split into list if comma-separated string
-        if isinstance(sites, str):
-            sites = sites.split(",")
-        if not sites:
-            return self._format_response("error", message="Sites parameter is required")
-
-        start = params.get("start")
-        end = params.get("end")
-
-        try:
-            df, md = nwis.get_discharge_measurements(sites=sites, start=start, end=end)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved {len(data_values)} discharge measurements"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_discharge_measurements", params)
 
     def get_discharge_peaks(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -570,33 +983,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with discharge peaks
         """
-        sites = params.get("sites")
-        # split into list if comma-separated string
-        if isinstance(sites, str):
-            sites = sites.split(",")
-        if not sites:
-            return self._format_response("error", message="Sites parameter is required")
-
-        start = params.get("start")
-        end = params.get("end")
-
-        try:
-            df, md = nwis.get_discharge_peaks(sites=sites, start=start, end=end)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved {len(data_values)} discharge peaks"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_discharge_peaks", params)
 
     def get_gwlevels(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -609,33 +996,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with groundwater levels
         """
-        sites = params.get("sites")
-        # split into list if comma-separated string
-        if isinstance(sites, str):
-            sites = sites.split(",")
-        if not sites:
-            return self._format_response("error", message="Sites parameter is required")
-
-        start = params.get("start")
-        end = params.get("end")
-
-        try:
-            df, md = nwis.get_gwlevels(sites=sites, start=start, end=end)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved {len(data_values)} groundwater level records"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_gwlevels", params)
 
     def get_info(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -647,42 +1008,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with site information
         """
-        sites = params.get("sites")
-        # split into list if comma-separated string
-        if isinstance(sites, str):
-            sites = sites.split(",")
-        stateCd = params.get("stateCd")
-        huc = params.get("huc")
-        bBox = params.get("bBox")
-        countyCd = params.get("countyCd")
-        startDt = params.get("startDt")
-        endDt = params.get("endDt")
-        period = params.get("period")
-        modifiedSince = params.get("modifiedSince")
-        parameterCd = params.get("parameterCd")
-        siteType = params.get("siteType")
-        siteOutput = params.get("siteOutput")
-        seriesCatalogOutput = params.get("seriesCatalogOutput")
-        # at least one of the parameters is required
-        if not any([sites, stateCd, huc, bBox, countyCd, startDt, endDt, period, modifiedSince, parameterCd, siteType]):
-            return self._format_response("error", message="At least one of the parameters is required")
-        try:
-            df, md = nwis.get_info(**params)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved site information"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_info", params)
 
     def get_pmcodes(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -694,26 +1020,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with parameter codes
         """
-        parameterCd = params.get("parameterCd")
-        if not parameterCd:
-            return self._format_response("error", message="Parameter code is required")
-        try:
-            df, md = nwis.get_pmcodes(parameterCd=parameterCd)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved {len(data_values,)} parameter codes"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_pmcodes", params)
 
     def get_ratings(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -725,29 +1032,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with rating data
         """
-        site = params.get("site")
-        if not site:
-            return self._format_response("error", message="Site parameter is required")
-
-        file_type = params.get("file_type", "base")
-
-        try:
-            df, md = nwis.get_ratings(site=site, file_type=file_type)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved {len(data_values)} rating records for site {site}"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_ratings", params)
 
     def get_record(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -759,23 +1044,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with record data
         """
-        try:
-            df = nwis.get_record(**params)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved {len(data_values)} records"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_record", params)
 
     def get_stats(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -787,31 +1056,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with statistics data
         """
-        sites = params.get("sites")
-        # split into list if comma-separated string
-        if isinstance(sites, str):
-            sites = sites.split(",")
-        parameterCd = params.get("parameterCd")
-        statReportType = params.get("statReportType")
-        statTypeCd = params.get("statTypeCd")
-
-        try:
-            df, md = nwis.get_stats(**params)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved statistical data"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_stats", params)
 
     def get_water_use(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -823,36 +1068,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with water use data
         """
-        years = params.get("years")
-        # make list if comma-separated string
-        if years and isinstance(years, str):
-            years = years.split(",")
-        state = params.get("state")
-        counties = params.get("counties")
-        categories = params.get("categories")
-        # must have at least one of the parameters
-        if not any([years, state, counties, categories]):
-            return self._format_response("error", message="At least one of the parameters is required")
-        try:
-            df, md = nwis.get_water_use(**params)
-            # drop some extra columns
-            df.drop(['state_cd', 'county_cd'], axis=1, errors='ignore', inplace=True)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            # column names and values separately
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Retrieved water use data"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("get_water_use", params)
 
     def what_sites(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -864,23 +1080,7 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response with matching sites
         """
-        try:
-            df, md = nwis.what_sites(**params)
-            # drop columns with all NaN values
-            df.dropna(axis=1, how='all', inplace=True)
-            # drop columns with all '-' values
-            df = df.loc[:, (df != '-').any(axis=0)]
-            column_names = df.columns.tolist()
-            data_values = df.values.tolist()
-
-            return self._format_response(
-                "success",
-                column_names=column_names,
-                data=data_values,
-                message=f"Found {len(data_values)} sites matching the criteria"
-            )
-        except Exception as e:
-            return self._format_response("error", message=str(e))
+        return self._run("what_sites", params)
 
     def format_mcp_context(self,
                           messages: Optional[List[Dict[str, Any]]] = None,
@@ -896,13 +1096,8 @@ class MCPDataRetrieval:
             Dict[str, Any]: MCP-formatted context dictionary
         """
         context = {
-            "functions": self.get_mcp_functions(),
-            "metadata": {
-                "source": "USGS Water Data",
-                "description": "Data retrieval interface for USGS water data through dataretrieval library",
-                "version": "1.0.0",
-                "documentation_url": "https://doi-usgs.github.io/dataretrieval/index.html"
-            }
+            "functions": _MCP_FUNCTIONS,
+            "metadata": dict(_METADATA)
         }
 
         if messages:
@@ -924,13 +1119,92 @@ class MCPDataRetrieval:
         Returns:
             Dict[str, Any]: Response from the function
         """
-        if function_name in self.functions:
-            return self.functions[function_name](params)
-        else:
-            return self._format_response(
-                "error",
-                message=f"Function '{function_name}' not found. Available functions: {', '.join(self.functions.keys())}"
-            )
+        function = self._functions.get(function_name)
+        if function is None:
+            return self._err(self._UNKNOWN_FUNCTION.format(function_name))
+        return function(params)
+
+    def _nwis_kwargs(self, function_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Keep only the parameters to forward to the underlying nwis call.
+
+        Functions with an _ALLOWED_KEYS entry forward only those keys; the others
+        forward everything except _DENIED_KEYS.
+
+        Args:
+            function_name (str): Name of the function being called
+            params (Dict[str, Any]): Parameters passed to the function
+
+        Returns:
+            Dict[str, Any]: Forwarded parameters with None values removed
+        """
+        allowed = self._ALLOWED_KEYS.get(function_name)
+        if allowed is None:
+            return {key: value for key, value in params.items() if key not in self._DENIED_KEYS and value is not None}
+        return {key: value for key, value in params.items() if key in allowed and value is not None}
+
+    def _validate(self, function_name: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Check the parameters of a call against the required-parameter tables.
+
+        Args:
+            function_name (str): Name of the function to call
+            params (Dict[str, Any]): Parameters to pass to the function
+
+        Returns:
+            Optional[Dict[str, Any]]: Error response, or None if the parameters are valid
+        """
+        present = {key for key, value in params.items() if value}
+        missing = self._REQUIRED.get(function_name, frozenset()) - present
+        if missing:
+            return self._err(f"Missing required parameter(s): {', '.join(sorted(missing))}")
+        any_of = self._ANY_OF.get(function_name)
+        if any_of is not None and any_of.isdisjoint(present):
+            return self._err(f"At least one of the parameters is required: {', '.join(sorted(any_of))}")
+        return None
+
+    def call_function_json(self, function_name: str, params: Dict[str, Any]) -> bytes:
+        """
+        Call a specific function by name and return the response as JSON bytes.
+
+        Args:
+            function_name (str): Name of the function to call
+            params (Dict[str, Any]): Parameters to pass to the function
+
+        Returns:
+            bytes: UTF-8 encoded JSON response
+        """
+        return orjson.dumps(self.call_function(function_name, params), default=json_default, option=_ORJSON_OPTIONS)
+
+    async def acall_function(self, function_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Call a specific function by name without blocking the event loop.
+
+        The nwis request runs on a thread of a dedicated pool sized to the shared
+        HTTP connection pool, so several calls awaited together keep their
+        requests in flight at the same time.
+
+        Args:
+            function_name (str): Name of the function to call
+            params (Dict[str, Any]): Parameters to pass to the function
+
+        Returns:
+            Dict[str, Any]: Response from the function
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_CALL_POOL, self.call_function, function_name, params)
+
+    async def acall_functions(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Call several functions concurrently.
+
+        Args:
+            calls (List[Tuple[str, Dict[str, Any]]]): (function_name, params) pairs
+
+        Returns:
+            List[Dict[str, Any]]: Responses in the same order as the calls
+        """
+        return list(await asyncio.gather(*(self.acall_function(name, params) for name, params in calls)))
 
 
 # Example usage
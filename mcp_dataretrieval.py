@@ -1,9 +1,147 @@
+import asyncio
+import inspect
 import json
-from typing import Dict, List, Any, Optional, Union
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Sequence, Tuple, Union
 import dataretrieval.nwis as nwis
+from dataretrieval.utils import NoSitesError
+import orjson
 import pandas as pd
+from cachetools import TTLCache, cached
 import mcp
 from mcp.server.fastmcp import FastMCP
+from _mcp_common import POOL_SIZE, arrow_payload, column_lists, install_session, json_default, prune_columns, rows
+
+# Let column projections share data with the (possibly cached) source frame
+pd.set_option("mode.copy_on_write", True)
+
+# Send every nwis request through the keep-alive session shared with the manual wrapper
+install_session()
+
+# nwis is synchronous, so its calls run here; the default executor behind
+# asyncio.to_thread has only min(32, cpu_count + 4) threads, which would cap
+# concurrent tool calls well below the connection pool on small machines
+_NWIS_POOL = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="nwis")
+
+
+def _freeze(params: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    """Turn keyword arguments into a hashable, order-independent cache key."""
+    return tuple(sorted(
+        (key, tuple(value) if isinstance(value, list) else value)
+        for key, value in params.items()
+    ))
+
+
+@lru_cache(maxsize=1024)
+def _split_sites(sites: str) -> Tuple[str, ...]:
+    """Split a comma-separated string of site codes into a tuple of stripped, interned codes."""
+    # interned codes make the cache keys built from them share strings and compare by identity
+    return tuple(sys.intern(site.strip()) for site in sites.split(","))
+
+
+def _site_codes(sites: Union[str, List[str]]) -> Tuple[str, ...]:
+    """Normalize site codes given as a comma-separated string or a list to a tuple."""
+    return _split_sites(sites) if isinstance(sites, str) else tuple(sites)
+
+
+# Handler arguments for programmatic callers only; the model cannot read a base64
+# Arrow stream, so they are left out of the tool schemas and descriptions
+_PROGRAMMATIC_PARAMS = ("response_format",)
+
+
+def _json_tool(handler: Callable[..., Awaitable[Dict[str, Any]]]) -> Callable[..., Awaitable[str]]:
+    """Wrap a handler so FastMCP emits its result as orjson-encoded text verbatim."""
+    @wraps(handler)
+    async def tool(*args: Any, **kwargs: Any) -> str:
+        # FastMCP passes str results through untouched instead of running its own
+        # to_jsonable_python + json.dumps passes; orjson also writes NaN as null
+        return orjson.dumps(
+            await handler(*args, **kwargs),
+            default=json_default,
+            option=orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+
+    # FastMCP builds the input schema from the signature and the description from
+    # the docstring, so both are published without the programmatic arguments
+    signature = inspect.signature(handler)
+    tool.__signature__ = signature.replace(parameters=[
+        param for param in signature.parameters.values() if param.name not in _PROGRAMMATIC_PARAMS
+    ])
+    if handler.__doc__:
+        tool.__doc__ = "\n".join(
+            line for line in handler.__doc__.splitlines()
+            if not line.strip().startswith(tuple(f"{name} (" for name in _PROGRAMMATIC_PARAMS))
+        )
+    return tool
+
+
+async def _fetch(fn_name: str, **params: Any) -> Any:
+    """Run a cached nwis call on a worker thread so the event loop keeps serving other tools."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_NWIS_POOL, _cached_nwis, fn_name, _freeze(params))
+
+
+# Upper bound on per-site nwis requests in flight, to respect USGS rate limits
+_SITE_CONCURRENCY = 8
+
+
+async def _fetch_sites(fn_name: str, sites: Sequence[str], **params: Any) -> pd.DataFrame:
+    """Fetch each site concurrently and concatenate the frames of the sites that have data."""
+    if len(sites) <= 1:
+        df, md = await _fetch(fn_name, sites=sites, **params)
+        return df
+
+    semaphore = asyncio.Semaphore(_SITE_CONCURRENCY)
+
+    async def fetch_one(site: str) -> pd.DataFrame:
+        async with semaphore:
+            df, md = await _fetch(fn_name, sites=[site], **params)
+            return df
+
+    results = await asyncio.gather(*(fetch_one(site) for site in sites), return_exceptions=True)
+    frames = []
+    for result in results:
+        # a site without data only fails the call if no other site has any
+        if isinstance(result, NoSitesError):
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        frames.append(result)
+    if not frames:
+        raise results[0]
+    return pd.concat(frames, copy=False)
+
+
+# Site descriptions, rating tables and site searches change rarely and are kept for
+# a day; time series (which may end today) are refetched after five minutes
+_META_FUNCTIONS = frozenset({"get_info", "get_ratings", "what_sites"})
+_META_CACHE = TTLCache(maxsize=256, ttl=24*60*60)
+_DATA_CACHE = TTLCache(maxsize=512, ttl=5*60)
+# TTLCache is not thread-safe and the calls run on _NWIS_POOL
+_CACHE_LOCK = threading.Lock()
+
+
+def _call_nwis(fn_name: str, frozen_params: Tuple[Tuple[str, Any], ...]) -> Any:
+    """Call nwis.<fn_name> with frozen parameters."""
+    # nwis expects lists rather than tuples for multi-valued arguments
+    kwargs = {key: list(value) if isinstance(value, tuple) else value
+              for key, value in frozen_params}
+    return getattr(nwis, fn_name)(**kwargs)
+
+
+_cached_meta = cached(_META_CACHE, lock=_CACHE_LOCK)(_call_nwis)
+_cached_data = cached(_DATA_CACHE, lock=_CACHE_LOCK)(_call_nwis)
+
+
+def _cached_nwis(fn_name: str, frozen_params: Tuple[Tuple[str, Any], ...]) -> Any:
+    """Call nwis.<fn_name> once per distinct set of parameters within its cache lifetime."""
+    if fn_name in _META_FUNCTIONS:
+        return _cached_meta(fn_name, frozen_params)
+    return _cached_data(fn_name, frozen_params)
+
 
 class MCPDataRetrieval:
     """
@@ -11,51 +149,124 @@ class MCPDataRetrieval:
     This wrapper provides MCP-compliant interfaces to access USGS water data.
     """
 
+    # Methods registered as MCP tools
+    TOOL_NAMES = (
+        "get_site_data",
+        "get_daily_values",
+        "get_instantaneous_values",
+        "get_discharge_measurements",
+        "get_discharge_peaks",
+        "get_gwlevels",
+        "get_ratings",
+        "what_sites",
+        "clear_cache",
+    )
+
     def __init__(self):
         """
         Initialize the MCP wrapper.
         """
         pass
 
-    def _format_dataframe_result(self, df: pd.DataFrame, message: str) -> Dict[str, Any]:
+    def _format_dataframe_result(self,
+                                 df: pd.DataFrame,
+                                 message: str,
+                                 orient: str = "split",
+                                 response_format: str = "json",
+                                 page_size: Optional[int] = None,
+                                 page: int = 0) -> Dict[str, Any]:
         """
         Format a pandas DataFrame into a standardized result structure.
 
         Args:
             df (pd.DataFrame): The DataFrame to format
             message (str): A message to include in the result
+            orient (str, optional): "split" returns row lists under "data";
+                "columns" maps each column name to its values under "columns", plus "dtypes"
+            response_format (str, optional): "arrow" ships the frame as a base64 Arrow
+                IPC stream under "data", with metadata.format "arrow", instead of JSON values
+            page_size (int, optional): When set, only rows
+                [page * page_size, (page + 1) * page_size) are returned, with paging details
+            page (int, optional): Zero-based page index used with page_size
 
         Returns:
             Dict[str, Any]: Formatted result
         """
-        # Clean the DataFrame
-        df.dropna(axis=1, how='all', inplace=True)
-        df = df.loc[:, (df != '-').any(axis=0)]
+        # Clean the DataFrame (without mutating it, it may be shared through the cache);
+        # cleaning drops every column of a frame without rows, and a frame without
+        # columns has nothing to clean, so both skip straight to an empty result
+        if len(df) and df.shape[1]:
+            df = prune_columns(df)
+        else:
+            df = df.iloc[:0, :0]
+
+        # Page after cleaning so every page has the same columns; the full frame
+        # stays in the response cache, so later pages do not refetch it
+        paging = {}
+        if page_size is not None:
+            if page_size < 1:
+                return {"status": "error", "message": f"page_size must be at least 1, got {page_size}"}
+            total_rows = len(df)
+            page = max(page, 0)
+            start = page * page_size
+            df = df.iloc[start:start + page_size]
+            paging = {
+                "page": page,
+                "page_size": page_size,
+                "total_rows": total_rows,
+                "has_more": start + page_size < total_rows
+            }
+
+        if response_format == "arrow":
+            return {"status": "success", **arrow_payload(df), **paging, "message": message}
 
         # Format for result
+        if orient == "columns":
+            return {
+                "status": "success",
+                "column_names": df.columns.tolist(),
+                "columns": dict(zip(df.columns, column_lists(df))),
+                "dtypes": [str(dtype) for dtype in df.dtypes],
+                **paging,
+                "message": message
+            }
         return {
             "status": "success",
             "column_names": df.columns.tolist(),
-            "data": df.values.tolist(),
+            "data": rows(df),
+            **paging,
             "message": message
         }
 
-    async def get_site_data(self, site_code: str) -> Dict[str, Any]:
+    async def get_site_data(self,
+                            site_code: str,
+                            orient: str = "split",
+                            response_format: str = "json",
+                            page_size: Optional[int] = None,
+                            page: int = 0) -> Dict[str, Any]:
         """
         Get information about a specific USGS water monitoring site.
 
         Args:
             site_code (str): USGS site code (e.g., '09380000')
+            orient (str, optional): 'split' for row lists, 'columns' for one list per column
+            response_format (str, optional): 'json', or 'arrow' for a base64 Arrow IPC stream
+            page_size (int, optional): Rows per page; when set only one page of rows is returned
+            page (int, optional): Zero-based page to return when page_size is set
 
         Returns:
             Dict[str, Any]: Site information
         """
         try:
-            site_info = nwis.get_record(sites=site_code, service="site")
-            if not site_info.empty:
+            site_info, md = await _fetch("get_info", sites=[site_code])
+            if site_info is not None and len(site_info):
                 return self._format_dataframe_result(
                     site_info,
-                    f"Successfully retrieved data for site {site_code}"
+                    f"Successfully retrieved data for site {site_code}",
+                    orient=orient,
+                    response_format=response_format,
+                    page_size=page_size,
+                    page=page
                 )
             else:
                 return {"status": "error", "message": f"No data found for site {site_code}"}
@@ -67,7 +278,11 @@ class MCPDataRetrieval:
                          parameter_code: Optional[str] = None,
                          statCd: Optional[str] = None,
                          start_date: Optional[str] = None,
-                         end_date: Optional[str] = None) -> Dict[str, Any]:
+                         end_date: Optional[str] = None,
+                         orient: str = "split",
+                         response_format: str = "json",
+                         page_size: Optional[int] = None,
+                         page: int = 0) -> Dict[str, Any]:
         """
         Get daily values of water data.
 
@@ -77,22 +292,31 @@ class MCPDataRetrieval:
             statCd (str, optional): USGS statistic code
             start_date (str, optional): Start date in YYYY-MM-DD format
             end_date (str, optional): End date in YYYY-MM-DD format
+            orient (str, optional): 'split' for row lists, 'columns' for one list per column
+            response_format (str, optional): 'json', or 'arrow' for a base64 Arrow IPC stream
+            page_size (int, optional): Rows per page; when set only one page of rows is returned
+            page (int, optional): Zero-based page to return when page_size is set
 
         Returns:
             Dict[str, Any]: Daily values data
         """
         try:
-            daily_data, md = nwis.get_dv(
+            daily_data, md = await _fetch(
+                "get_dv",
                 sites=site_code,
                 parameterCd=parameter_code,
                 statCd=statCd,
                 start=start_date,
                 end=end_date
             )
-            if not daily_data.empty:
+            if len(daily_data):
                 result = self._format_dataframe_result(
                     daily_data,
-                    f"Successfully retrieved daily values for site {site_code}"
+                    f"Successfully retrieved daily values for site {site_code}",
+                    orient=orient,
+                    response_format=response_format,
+                    page_size=page_size,
+                    page=page
                 )
                 return result
             else:
@@ -110,7 +334,11 @@ class MCPDataRetrieval:
                                 site_code: str,
                                 parameter_code: str,
                                 start_date: Optional[str] = None,
-                                end_date: Optional[str] = None) -> Dict[str, Any]:
+                                end_date: Optional[str] = None,
+                                orient: str = "split",
+                                response_format: str = "json",
+                                page_size: Optional[int] = None,
+                                page: int = 0) -> Dict[str, Any]:
         """
         Get instantaneous values of water data.
 
@@ -119,21 +347,30 @@ class MCPDataRetrieval:
             parameter_code (str): USGS parameter code (e.g., '00060' for discharge)
             start_date (str, optional): Start date in YYYY-MM-DD format
             end_date (str, optional): End date in YYYY-MM-DD format
+            orient (str, optional): 'split' for row lists, 'columns' for one list per column
+            response_format (str, optional): 'json', or 'arrow' for a base64 Arrow IPC stream
+            page_size (int, optional): Rows per page; when set only one page of rows is returned
+            page (int, optional): Zero-based page to return when page_size is set
 
         Returns:
             Dict[str, Any]: Instantaneous values data
         """
         try:
-            iv_data, md = nwis.get_iv(
+            iv_data, md = await _fetch(
+                "get_iv",
                 sites=site_code,
                 parameterCd=parameter_code,
                 start=start_date,
                 end=end_date
             )
-            if not iv_data.empty:
+            if len(iv_data):
                 result = self._format_dataframe_result(
                     iv_data,
-                    f"Successfully retrieved instantaneous values for site {site_code}"
+                    f"Successfully retrieved instantaneous values for site {site_code}",
+                    orient=orient,
+                    response_format=response_format,
+                    page_size=page_size,
+                    page=page
                 )
                 return result
             else:
@@ -150,7 +387,11 @@ class MCPDataRetrieval:
     async def get_discharge_measurements(self,
                                   sites: str,
                                   start: Optional[str] = None,
-                                  end: Optional[str] = None) -> Dict[str, Any]:
+                                  end: Optional[str] = None,
+                                  orient: str = "split",
+                                  response_format: str = "json",
+                                  page_size: Optional[int] = None,
+                                  page: int = 0) -> Dict[str, Any]:
         """
         Get discharge measurements from the waterdata service.
 
@@ -158,18 +399,25 @@ class MCPDataRetrieval:
             sites (str): USGS site code(s), comma-separated
             start (str, optional): Start date in YYYY-MM-DD format
             end (str, optional): End date in YYYY-MM-DD format
+            orient (str, optional): 'split' for row lists, 'columns' for one list per column
+            response_format (str, optional): 'json', or 'arrow' for a base64 Arrow IPC stream
+            page_size (int, optional): Rows per page; when set only one page of rows is returned
+            page (int, optional): Zero-based page to return when page_size is set
 
         Returns:
             Dict[str, Any]: Discharge measurements data
         """
         try:
-            # Split sites into list if comma-separated
-            sites_list = sites.split(",") if isinstance(sites, str) else sites
+            sites_list = _site_codes(sites)
 
-            df, md = nwis.get_discharge_measurements(sites=sites_list, start=start, end=end)
+            df = await _fetch_sites("get_discharge_measurements", sites_list, start=start, end=end)
             result = self._format_dataframe_result(
                 df,
-                f"Retrieved {len(df)} discharge measurements"
+                f"Retrieved {len(df)} discharge measurements",
+                orient=orient,
+                response_format=response_format,
+                page_size=page_size,
+                page=page
             )
             return result
         except Exception as e:
@@ -178,7 +426,11 @@ class MCPDataRetrieval:
     async def get_discharge_peaks(self,
                            sites: str,
                            start: Optional[str] = None,
-                           end: Optional[str] = None) -> Dict[str, Any]:
+                           end: Optional[str] = None,
+                           orient: str = "split",
+                           response_format: str = "json",
+                           page_size: Optional[int] = None,
+                           page: int = 0) -> Dict[str, Any]:
         """
         Get discharge peaks from the waterdata service.
 
@@ -186,17 +438,25 @@ class MCPDataRetrieval:
             sites (str): USGS site code(s), comma-separated
             start (str, optional): Start date in YYYY-MM-DD format
             end (str, optional): End date in YYYY-MM-DD format
+            orient (str, optional): 'split' for row lists, 'columns' for one list per column
+            response_format (str, optional): 'json', or 'arrow' for a base64 Arrow IPC stream
+            page_size (int, optional): Rows per page; when set only one page of rows is returned
+            page (int, optional): Zero-based page to return when page_size is set
 
         Returns:
             Dict[str, Any]: Discharge peaks data
         """
         try:
-            sites_list = sites.split(",") if isinstance(sites, str) else sites
-            df, md = nwis.get_discharge_peaks(sites=sites_list, start=start, end=end)
+            sites_list = _site_codes(sites)
+            df = await _fetch_sites("get_discharge_peaks", sites_list, start=start, end=end)
 
             result = self._format_dataframe_result(
                 df,
-                f"Retrieved {len(df)} discharge peaks"
+                f"Retrieved {len(df)} discharge peaks",
+                orient=orient,
+                response_format=response_format,
+                page_size=page_size,
+                page=page
             )
             return result
         except Exception as e:
@@ -205,7 +465,11 @@ class MCPDataRetrieval:
     async def get_gwlevels(self,
                     sites: str,
                     start: Optional[str] = None,
-                    end: Optional[str] = None) -> Dict[str, Any]:
+                    end: Optional[str] = None,
+                    orient: str = "split",
+                    response_format: str = "json",
+                    page_size: Optional[int] = None,
+                    page: int = 0) -> Dict[str, Any]:
         """
         Get groundwater levels from the waterdata service.
 
@@ -213,17 +477,25 @@ class MCPDataRetrieval:
             sites (str): USGS site code(s), comma-separated
             start (str, optional): Start date in YYYY-MM-DD format
             end (str, optional): End date in YYYY-MM-DD format
+            orient (str, optional): 'split' for row lists, 'columns' for one list per column
+            response_format (str, optional): 'json', or 'arrow' for a base64 Arrow IPC stream
+            page_size (int, optional): Rows per page; when set only one page of rows is returned
+            page (int, optional): Zero-based page to return when page_size is set
 
         Returns:
             Dict[str, Any]: Groundwater levels data
         """
         try:
-            sites_list = sites.split(",") if isinstance(sites, str) else sites
-            df, md = nwis.get_gwlevels(sites=sites_list, start=start, end=end)
+            sites_list = _site_codes(sites)
+            df = await _fetch_sites("get_gwlevels", sites_list, start=start, end=end)
 
             result = self._format_dataframe_result(
                 df,
-                f"Retrieved {len(df)} groundwater level records"
+                f"Retrieved {len(df)} groundwater level records",
+                orient=orient,
+                response_format=response_format,
+                page_size=page_size,
+                page=page
             )
             return result
         except Exception as e:
@@ -231,23 +503,35 @@ class MCPDataRetrieval:
 
     async def get_ratings(self,
                    site: str,
-                   file_type: str = "base") -> Dict[str, Any]:
+                   file_type: str = "base",
+                   orient: str = "split",
+                   response_format: str = "json",
+                   page_size: Optional[int] = None,
+                   page: int = 0) -> Dict[str, Any]:
         """
         Get rating table for an active USGS streamgage.
 
         Args:
             site (str): USGS site code
             file_type (str, optional): File type (base, corr, exsa)
+            orient (str, optional): 'split' for row lists, 'columns' for one list per column
+            response_format (str, optional): 'json', or 'arrow' for a base64 Arrow IPC stream
+            page_size (int, optional): Rows per page; when set only one page of rows is returned
+            page (int, optional): Zero-based page to return when page_size is set
 
         Returns:
             Dict[str, Any]: Rating data
         """
         try:
-            df, md = nwis.get_ratings(site=site, file_type=file_type)
+            df, md = await _fetch("get_ratings", site=site, file_type=file_type)
 
             result = self._format_dataframe_result(
                 df,
-                f"Retrieved {len(df)} rating records for site {site}"
+                f"Retrieved {len(df)} rating records for site {site}",
+                orient=orient,
+                response_format=response_format,
+                page_size=page_size,
+                page=page
             )
             return result
         except Exception as e:
@@ -257,7 +541,11 @@ class MCPDataRetrieval:
                   stateCd: Optional[str] = None,
                   siteType: Optional[str] = None,
                   county: Optional[str] = None,
-                  huc: Optional[str] = None) -> Dict[str, Any]:
+                  huc: Optional[str] = None,
+                  orient: str = "split",
+                  response_format: str = "json",
+                  page_size: Optional[int] = None,
+                  page: int = 0) -> Dict[str, Any]:
         """
         Search NWIS for sites within a region with specific data.
 
@@ -266,45 +554,56 @@ class MCPDataRetrieval:
             siteType (str, optional): Type of site (e.g., 'ST' for stream)
             county (str, optional): County code
             huc (str, optional): Hydrologic Unit Code
+            orient (str, optional): 'split' for row lists, 'columns' for one list per column
+            response_format (str, optional): 'json', or 'arrow' for a base64 Arrow IPC stream
+            page_size (int, optional): Rows per page; when set only one page of rows is returned
+            page (int, optional): Zero-based page to return when page_size is set
 
         Returns:
             Dict[str, Any]: Matching sites data
         """
         try:
-            params = {}
-            if stateCd: params["stateCd"] = stateCd
-            if siteType: params["siteType"] = siteType
-            if county: params["county"] = county
-            if huc: params["huc"] = huc
+            criteria = (("stateCd", stateCd), ("siteType", siteType), ("county", county), ("huc", huc))
+            params = {key: value for key, value in criteria if value}
 
-            df, md = nwis.what_sites(**params)
+            df, md = await _fetch("what_sites", **params)
 
             result = self._format_dataframe_result(
                 df,
-                f"Found {len(df)} sites matching the criteria"
+                f"Found {len(df)} sites matching the criteria",
+                orient=orient,
+                response_format=response_format,
+                page_size=page_size,
+                page=page
             )
             return result
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    async def clear_cache(self) -> Dict[str, Any]:
+        """
+        Discard all cached NWIS responses so subsequent calls refetch them.
+
+        Returns:
+            Dict[str, Any]: Confirmation including the number of entries dropped
+        """
+        with _CACHE_LOCK:
+            size = len(_META_CACHE) + len(_DATA_CACHE)
+            _META_CACHE.clear()
+            _DATA_CACHE.clear()
+        return {"status": "success", "message": f"Cleared {size} cached responses"}
+
 
 # Example usage
 if __name__ == "__main__":
     # Create the MCP wrapper instance
     data_retrieval = MCPDataRetrieval()
 
-    # Create a FastMCP instance with the data retrieval tools
-    tools = {
-        "get_site_data": data_retrieval.get_site_data,
-        "get_daily_values": data_retrieval.get_daily_values,
-        "get_instantaneous_values": data_retrieval.get_instantaneous_values,
-        "get_discharge_measurements": data_retrieval.get_discharge_measurements,
-        "get_discharge_peaks": data_retrieval.get_discharge_peaks,
-        "get_gwlevels": data_retrieval.get_gwlevels,
-        "get_ratings": data_retrieval.get_ratings,
-        "what_sites": data_retrieval.what_sites
-    }
+    # Create a FastMCP instance and register the data retrieval tools, serialized
+    # with orjson (FastMCP's constructor takes settings, not tools)
+    server = FastMCP(host="127.0.0.1", port=8000)
+    for name in MCPDataRetrieval.TOOL_NAMES:
+        server.add_tool(_json_tool(getattr(data_retrieval, name)), name=name)
 
     # Start the FastMCP server
-    server = FastMCP(tools=tools, host="127.0.0.1", port=8000)
     server.run()
\ No newline at end of file